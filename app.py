@@ -1,9 +1,14 @@
 import streamlit as st
-import pandas as pd
 
 # Importações dos módulos atualizados
-from modules.data_loader import load_multiple_years
-from modules.ui import create_sidebar, filter_dataframe
+from modules.data_loader import load_years_with_report, dataset_version, previous_version, columnar_sources
+from modules.query_backend import QUERY_BACKEND, get_backend
+from modules.dataset import prepare_dataset, is_prepared
+from modules.figure_cache import cached_figure
+from modules.sample import use_approximate, prepare_sample, estimate_plan, estimate_grid
+from modules.table import show_paginated_table
+from modules import perf
+from modules.ui import create_sidebar, filter_dataframe, pending_selection, show_load_report
 from modules.graphs import (
     plot_line_evolution, 
     plot_bar_ranking, 
@@ -16,52 +21,51 @@ from modules.graphs import (
 st.set_page_config(page_title="DataBurn Dashboard", layout="wide")
 CURRENT_THEME = "plotly_white"
 CURRENT_MAP = "carto-positron"
+COL_ESTADO = 'Estado'; COL_CIDADE = 'Municipio'; COL_FOGO = 'RiscoFogo'; COL_CHUVA = 'Precipitacao'
+# Granularidades dos gráficos temporais -> coluna agregada (modules/temporal.py)
+GRANULARIDADES = {"Ano": "Ano", "Mês": "Mes", "Semana": "Semana", "Dia": "Dia"}
+VOLUMES = {"Mês do ano": "Mes_Nome", **GRANULARIDADES}
 
-# sidebar e loading
-anos_selecionados = create_sidebar()
 
-if anos_selecionados:
-    df_raw = load_multiple_years(anos_selecionados)
-else:
-    df_raw = None
+def colunas_tempo(colunas):
+    """Colunas temporais escolhidas nos rádios (valor atual da sessão)."""
+    if 'DataHora' not in colunas:
+        return ["Ano", "Mes_Nome"]
+    return [GRANULARIDADES[st.session_state.get("tipo_view", "Ano")],
+            VOLUMES[st.session_state.get("tipo_volume", "Mês do ano")]]
 
-# Título do Dashboard
-st.title("DataBurn: Painel de Monitoramento de Queimadas")
-st.markdown("---")
 
-if df_raw is not None:
-    # TRATAMENTO DE DADOS
-    mapa_meses = {
-        1: '01-Jan', 2: '02-Fev', 3: '03-Mar', 4: '04-Abr',
-        5: '05-Mai', 6: '06-Jun', 7: '07-Jul', 8: '08-Ago',
-        9: '09-Set', 10: '10-Out', 11: '11-Nov', 12: '12-Dez'
-    }
-    col_data = 'DataHora' 
-    if col_data in df_raw.columns:
-        df_raw[col_data] = pd.to_datetime(df_raw[col_data], errors='coerce')
-        df_raw['Ano'] = df_raw[col_data].dt.year
-        df_raw['Mes_Num'] = df_raw[col_data].dt.month
-        df_raw['Mes_Nome'] = df_raw['Mes_Num'].map(mapa_meses)
-    else:
-        # A2: Melhorando o tratamento de data ausente
-        df_raw['Ano'] = df_raw['ano_origem']
-        df_raw['Mes_Num'] = 0 # Valor numérico para evitar erros de tipo
-        df_raw['Mes_Nome'] = 'N/A' # Mantém N/A para visualização
-
-    col_estado = 'Estado'; col_cidade = 'Municipio'; col_fogo = 'RiscoFogo'; col_chuva = 'Precipitacao'
-    # Tratamento de valores ausentes/inválidos na coluna RiscoFogo
-    # O valor -999.0 é um placeholder comum para dados ausentes/inválidos.
-    if col_fogo in df_raw.columns:
-        df_raw[col_fogo] = df_raw[col_fogo].replace(-999.0, pd.NA).astype('Float64')
-        
-    df_filtered = filter_dataframe(df_raw, col_estado, col_cidade)
+class FonteGraficos:
+    """De onde os blocos tiram os dados: tabela(dim) e grade() vêm do plano de
+    agregação exato ou das estimativas da amostra. chave None = estimativa
+    (não usa o cache de figuras). regiao é o recorte desenhado no mapa."""
+
+    def __init__(self, tabela, grade, chave=None, sufixo="", regiao=None):
+        self.tabela = tabela
+        self.grade = grade
+        self.chave = chave
+        self.sufixo = sufixo
+        self.regiao = regiao
+
+    def figura(self, nome, parametros, construir):
+        if self.chave is None:
+            return construir()
+        return cached_figure(nome, self.chave + parametros, construir)
+
 
+def bloco_temporal(fonte, colunas, estimativa=False):
     # BLOCO 1: ANÁLISE TEMPORAL
     st.header("1. Comportamento Temporal")
     
-    # Configurações de Agrupamento
-    tipo_view = st.radio("Visualizar evolução por:", ["Ano", "Mês"], horizontal=True)
-    col_tempo = "Ano" if tipo_view == "Ano" else "Mes_Nome"
+    # Configurações de Agrupamento. Nas estimativas os rádios não são criados
+    # (eles existem uma vez só, no bloco exato): usa o valor atual.
+    # Sem DataHora não há cubo diário: só Ano e mês do ano
+    com_datas = 'DataHora' in colunas
+    if estimativa or not com_datas:
+        tipo_view = st.session_state.get("tipo_view", "Ano") if com_datas else "Ano"
+    else:
+        tipo_view = st.radio("Visualizar evolução por:", list(GRANULARIDADES), horizontal=True, key="tipo_view")
+    col_tempo = GRANULARIDADES[tipo_view]
     # df_sorted removido: a ordenação e agrupamento são feitos dentro da função plot_line_evolution
 
     # GRÁFICO 1.A: TENDÊNCIA (LINHA)
@@ -70,13 +74,14 @@ if df_raw is not None:
     > **O que é:** Mostra a média do risco de fogo ao longo do tempo.  
     > **Utilidade:** Permite identificar se a situação está piorando (linha subindo) ou melhorando (linha descendo) no período selecionado.
     """)
-    if col_fogo in df_filtered.columns:
-        fig_evolu = plot_line_evolution(
-            df_filtered, x_col=col_tempo, y_col=col_fogo, 
-            title=f"Evolução da Média de Risco ({tipo_view})", 
+    if COL_FOGO in colunas:
+        fig_evolu = fonte.figura("evolucao", (col_tempo, CURRENT_THEME), lambda: plot_line_evolution(
+            fonte.tabela(col_tempo), x_col=col_tempo, y_col=COL_FOGO, 
+            title=f"Evolução da Média de Risco ({tipo_view}){fonte.sufixo}", 
             template=CURRENT_THEME
-        )
-        st.plotly_chart(fig_evolu, use_container_width=True)
+        ))
+        with perf.stage("render:evolucao"):
+            st.plotly_chart(fig_evolu, use_container_width=True)
     
     st.divider()
 
@@ -86,17 +91,26 @@ if df_raw is not None:
     > **O que é:** Contagem total de focos de incêndio por período.  
     > **Utilidade:** Revela os meses de pico, ajudando a planejar ações preventivas antes da época crítica.
     """)
-    if 'Mes_Nome' in df_filtered.columns:
+    if estimativa or not com_datas:
+        tipo_volume = st.session_state.get("tipo_volume", "Mês do ano") if com_datas else "Mês do ano"
+    else:
+        tipo_volume = st.radio("Agrupar focos por:", list(VOLUMES), horizontal=True, key="tipo_volume")
+    col_volume = VOLUMES[tipo_volume]
+    titulo_volume = "Mês (Sazonalidade)" if col_volume == "Mes_Nome" else tipo_volume
+    if col_volume != "Mes_Nome" or 'Mes_Nome' in colunas:
         # Removendo ordenação redundante (df_sazonal)
-        fig_saz = plot_seasonal_volume(
-            df_filtered, time_col="Mes_Nome", 
-            title="Total de Focos por Mês (Sazonalidade)", 
+        fig_saz = fonte.figura("sazonal", (col_volume, CURRENT_THEME), lambda: plot_seasonal_volume(
+            fonte.tabela(col_volume), time_col=col_volume, 
+            title=f"Total de Focos por {titulo_volume}{fonte.sufixo}", 
             template=CURRENT_THEME
-        )
-        st.plotly_chart(fig_saz, use_container_width=True)
+        ))
+        with perf.stage("render:sazonal"):
+            st.plotly_chart(fig_saz, use_container_width=True)
 
     st.markdown("---")
 
+
+def bloco_rankings(fonte, colunas):
     # BLOCO 2: RANKINGS
     st.header("2. Áreas Críticas (Rankings)")
     st.markdown("Comparativo entre as cidades com maiores índices de risco versus precipitação (chuva).")
@@ -104,25 +118,29 @@ if df_raw is not None:
     col_rank1, col_rank2 = st.columns(2)
     
     with col_rank1:
-        if col_fogo in df_filtered.columns:
-            fig_risk = plot_bar_ranking(
-                df_filtered, cat_col=col_cidade, val_col=col_fogo,
-                title="Top 10 Cidades: Risco de Fogo", 
+        if COL_FOGO in colunas:
+            fig_risk = fonte.figura("ranking_risco", (CURRENT_THEME,), lambda: plot_bar_ranking(
+                fonte.tabela(COL_CIDADE), cat_col=COL_CIDADE, val_col=COL_FOGO,
+                title=f"Top 10 Cidades: Risco de Fogo{fonte.sufixo}", 
                 color_seq="Reds", is_percent=True, template=CURRENT_THEME
-            )
-            st.plotly_chart(fig_risk, use_container_width=True)
+            ))
+            with perf.stage("render:ranking_risco"):
+                st.plotly_chart(fig_risk, use_container_width=True)
 
     with col_rank2:
-        if col_chuva in df_filtered.columns:
-            fig_rain = plot_bar_ranking(
-                df_filtered, cat_col=col_cidade, val_col=col_chuva,
-                title="Top 10 Cidades: Precipitação (Chuva)", 
+        if COL_CHUVA in colunas:
+            fig_rain = fonte.figura("ranking_chuva", (CURRENT_THEME,), lambda: plot_bar_ranking(
+                fonte.tabela(COL_CIDADE), cat_col=COL_CIDADE, val_col=COL_CHUVA,
+                title=f"Top 10 Cidades: Precipitação (Chuva){fonte.sufixo}", 
                 color_seq="Blues", is_percent=False, template=CURRENT_THEME
-            )
-            st.plotly_chart(fig_rain, use_container_width=True)
+            ))
+            with perf.stage("render:ranking_chuva"):
+                st.plotly_chart(fig_rain, use_container_width=True)
 
     st.markdown("---")
 
+
+def bloco_geo(fonte, colunas):
     # BLOCO 3: GEOESPACIAL E AMBIENTAL
     st.header("3. Análise Geográfica e Ambiental")
     
@@ -133,12 +151,13 @@ if df_raw is not None:
         st.markdown("""
         **Utilidade:** Identifica visualmente as "Zonas Quentes" no território.  
         """)
-        if 'Latitude' in df_filtered.columns:
-            # Gera o mapa PyDeck
-            deck_map = plot_map_density(
-                df_filtered, 'Latitude', 'Longitude'
-            )
-            st.pydeck_chart(deck_map, use_container_width=True)
+        if 'Latitude' in colunas:
+            # Gera o mapa PyDeck a partir da grade pré-agregada
+            deck_map = fonte.figura("mapa", (), lambda: plot_map_density(
+                fonte.grade(), 'Latitude', 'Longitude', regiao=fonte.regiao
+            ))
+            with perf.stage("render:mapa"):
+                st.pydeck_chart(deck_map, use_container_width=True)
         else:
             st.warning("Sem coordenadas GPS.")
 
@@ -147,15 +166,151 @@ if df_raw is not None:
         st.markdown("""
         **Utilidade:** Mostra qual ecossistema está sofrendo mais impacto proporcionalmente.
         """)
-        if 'Bioma' in df_filtered.columns:
-            fig_bio = plot_biome_distribution(
-                df_filtered, 'Bioma', template=CURRENT_THEME
-            )
-            st.plotly_chart(fig_bio, use_container_width=True)
+        if 'Bioma' in colunas:
+            fig_bio = fonte.figura("biomas", (CURRENT_THEME,), lambda: plot_biome_distribution(
+                fonte.tabela('Bioma'), 'Bioma', template=CURRENT_THEME
+            ))
+            with perf.stage("render:biomas"):
+                st.plotly_chart(fig_bio, use_container_width=True)
+
+
+# Cada bloco exato é um fragmento: um widget dentro dele (rádios de granularidade, controles
+# da tabela) reexecuta só o bloco, não a página. Filtros da sidebar e anos
+# continuam reexecutando tudo, porque mudam os dados de todos os blocos.
+# perf.fragment mede a reexecução de um fragmento como um rerun próprio.
+BLOCOS = [
+    ('temporal', st.fragment(perf.fragment(bloco_temporal))),
+    ('rankings', st.fragment(perf.fragment(bloco_rankings))),
+    ('geo', st.fragment(perf.fragment(bloco_geo))),
+]
+tabela_paginada = st.fragment(perf.fragment(show_paginated_table))
+
+
+def plano_sob_demanda(calcular, dims):
+    """tabela(dim) de um plano de agregação calculado na primeira consulta, em
+    uma passada para todas as dims. Uma dimensão nova (outra granularidade
+    escolhida no fragmento) entra no plano com as que ainda faltarem."""
+    plano = {}
+    def tabela(dim):
+        if dim not in plano:
+            faltam = [d for d in dims if d not in plano]
+            with perf.stage("plano_agregacao") as etapa:
+                plano.update(calcular(faltam if dim in faltam else faltam + [dim]))
+                etapa['linhas_saida'] = sum(len(t) for t in plano.values())
+        return plano[dim]
+    return tabela
+
+
+
+# Instrumentação opcional (DATABURN_PERF=1 ou ?perf=1)
+perf.start_run()
+
+# sidebar e loading
+anos_selecionados = create_sidebar()
+
+if anos_selecionados:
+    df_raw, relatorio_carga = load_years_with_report(anos_selecionados)
+    show_load_report(relatorio_carga)
+else:
+    df_raw = None
+
+# Título do Dashboard
+st.title("DataBurn: Painel de Monitoramento de Queimadas")
+st.markdown("---")
+
+if df_raw is not None:
+    # Tipos, sentinelas e colunas Ano/Mes_Num/Mes_Nome já vêm do loader (modules/schema.py)
+    colunas = list(df_raw.columns)
+
+    versao_dados = dataset_version(relatorio_carga)
+    # Ano e Mes_Nome sempre no plano, mais as granularidades escolhidas nos rádios
+    dims_plano = list(dict.fromkeys(
+        [c for c in ['Ano', 'Mes_Nome', COL_CIDADE, 'Bioma'] if c in colunas] + colunas_tempo(colunas)
+    ))
+
+    # Modo aproximado (modules/sample.py): em conjuntos grandes, enquanto o dataset
+    # exato desta versão não está pronto, os gráficos aparecem primeiro estimados
+    aproximado = use_approximate(len(df_raw), is_prepared(versao_dados))
+    aviso = st.empty()
+    # Um contêiner por bloco: as estimativas ocupam o lugar e depois dão lugar aos exatos
+    conteineres = {nome: st.container() for nome, _ in BLOCOS}
+
+    # Primeiro as estimativas, da amostra estratificada (ano x mês x estado)
+    if aproximado:
+        # Os widgets de filtro só saem com o índice: a seleção vem do estado deles
+        estado_sel, cidade_sel, periodo, regiao = pending_selection()
+        with perf.stage("estimativas", linhas_entrada=len(df_raw)) as etapa:
+            # Amostras dos anos, sorteadas na carga: aqui só são juntadas
+            amostra = prepare_sample(versao_dados, [item['amostra'] for item in relatorio_carga
+                                                    if item.get('amostra') is not None])
+            estimativas = estimate_plan(amostra, dims_plano, estado_sel, cidade_sel, periodo, regiao)
+            etapa['linhas_saida'] = len(amostra)
+        aviso.info(
+            f"⏳ Estimativas a partir de uma amostra de {len(amostra):,} focos "
+            "(intervalos de 95% nos rankings). Calculando os resultados exatos..."
+        )
+        fonte_estimada = FonteGraficos(
+            lambda dim: estimativas[dim], lambda: estimate_grid(amostra, estado_sel, cidade_sel, periodo, regiao),
+            sufixo=" (estimativa)", regiao=regiao
+        )
+        provisorios = {}
+        for nome, _ in BLOCOS:
+            with conteineres[nome]:
+                provisorios[nome] = st.empty()
+            with provisorios[nome].container():
+                if nome == 'temporal':
+                    bloco_temporal(fonte_estimada, colunas, estimativa=True)
+                elif nome == 'rankings':
+                    bloco_rankings(fonte_estimada, colunas)
+                else:
+                    bloco_geo(fonte_estimada, colunas)
+
+    # Dataset preparado (cubo + índice de filtros): uma vez por versão dos dados, somente leitura
+    with perf.stage("prepare_dataset", linhas_entrada=len(df_raw)) as etapa:
+        # Ano corrente que só recebeu linhas novas: cubo e grade são atualizados com elas
+        dados, etapa['cache'] = perf.cached_call(
+            prepare_dataset, versao_dados, df_raw, COL_ESTADO, COL_CIDADE, previous_version(relatorio_carga)
+        )
+    # Período: busca binária no índice ordenado por DataHora (modules/temporal.py)
+    # Região: candidatos pelo índice espacial em grade (modules/spatial.py)
+    df_filtered, _, (estado_sel, cidade_sel, periodo, regiao) = filter_dataframe(
+        dados['df'], COL_ESTADO, COL_CIDADE, index=dados['index'],
+        tempo=dados['tempo'], espaco=dados['espaco']
+    )
+
+    # Backend das agregações dos gráficos (DATABURN_QUERY_BACKEND): pandas sobre o
+    # cubo em memória (padrão) ou arrow direto nos arquivos Parquet dos anos
+    backend = get_backend(
+        QUERY_BACKEND, versao_dados, dados, tuple(columnar_sources(relatorio_carga))
+    )
+    # Chave das figuras: estado dos filtros, não os dados (modules/figure_cache.py)
+    chave_filtros = (versao_dados, backend.nome, estado_sel, cidade_sel, periodo, regiao)
+
+    # Plano de agregação: as tabelas de todos os gráficos em uma passada sobre os
+    # dados filtrados, calculado só se alguma figura faltar no cache. Os fragmentos
+    # guardam a fonte: numa reexecução parcial o plano já calculado é reaproveitado
+    tabela_plano = plano_sob_demanda(
+        lambda dims: backend.aggregate_many(dims, estado_sel, cidade_sel, periodo, regiao), dims_plano
+    )
+    fonte_exata = FonteGraficos(
+        tabela_plano, lambda: backend.grid(estado_sel, cidade_sel, periodo, regiao), chave_filtros, regiao=regiao
+    )
+
+    # Resultados exatos substituem as estimativas nos mesmos contêineres
+    for nome, bloco in BLOCOS:
+        if aproximado:
+            provisorios[nome].empty()
+        with conteineres[nome]:
+            bloco(fonte_exata, colunas)
+    aviso.empty()
 
     # TABELA FINAL
     with st.expander("Ver Tabela de Dados Completa"):
-        st.dataframe(df_filtered, use_container_width=True)
+        # Paginada no servidor: só a página atual vai para o navegador
+        with perf.stage("render:tabela", linhas_entrada=len(df_filtered)):
+            tabela_paginada(df_filtered, chave_filtros)
 
 else:
-    st.info("Por favor, selecione os anos na barra lateral para carregar os dados.")
\ No newline at end of file
+    st.info("Por favor, selecione os anos na barra lateral para carregar os dados.")
+
+perf.finish_run()
@@ -0,0 +1,129 @@
+# modules/cube.py
+import pandas as pd
+import numpy as np
+
+from modules.schema import concat_frames
+
+""" Cubo de agregação pré-calculado (ano x mês x estado x município x bioma).
+Os gráficos e filtros trabalham sobre o cubo em vez das detecções brutas."""
+
+DIMENSOES_CUBO = ['Ano', 'Mes_Num', 'Mes_Nome', 'Estado', 'Municipio', 'Bioma']
+MEDIDAS_CUBO = ['RiscoFogo', 'Precipitacao']
+
+# Coluna com o número de detecções de cada célula
+COL_FOCOS = 'n_focos'
+
+
+def build_cube(df, dims=DIMENSOES_CUBO):
+    """Agrupa as detecções uma vez por célula do cubo.
+    Para cada medida guarda a soma (<col>_soma) e a contagem de não nulos
+    (<col>_n), o que permite recompor médias exatas em qualquer nível."""
+    dims = [c for c in dims if c in df.columns]
+    medidas = [c for c in MEDIDAS_CUBO if c in df.columns]
+
+    # Soma em float64 para não acumular erro de arredondamento do float32
+    base = df[dims].copy(deep=False)
+    for col in medidas:
+        base[f'{col}_soma'] = df[col].astype(np.float64)
+        base[f'{col}_n'] = df[col].notna().astype(np.int64)
+    base[COL_FOCOS] = np.int64(1)
+
+    # dropna=False: linhas sem Estado/Bioma continuam contando nos totais
+    cube = base.groupby(dims, observed=True, dropna=False, sort=False).sum()
+    return cube.reset_index()
+
+
+def merge_partials(a, b, dims):
+    """Soma duas tabelas parciais (cubo ou grade) célula a célula.
+    As categorias das dimensões são unificadas antes da soma."""
+    dims = [c for c in dims if c in a.columns]
+    juntas = concat_frames([a, b])
+    return juntas.groupby(dims, observed=True, dropna=False, sort=False).sum().reset_index()
+
+
+def merge_cubes(a, b):
+    """Cubo de a + b, para acrescentar linhas novas sem reagregar tudo."""
+    return merge_partials(a, b, DIMENSOES_CUBO)
+
+
+def is_cube(df):
+    return COL_FOCOS in df.columns
+
+
+def group_mean(df, by, col):
+    """Média de col por by, a partir das detecções ou do cubo.
+    Retorna um DataFrame com as colunas [by, col]."""
+    if not is_cube(df):
+        return df.groupby(by, observed=True)[col].mean().reset_index()
+
+    somas = df.groupby(by, observed=True)[[f'{col}_soma', f'{col}_n']].sum()
+    media = somas[f'{col}_soma'] / somas[f'{col}_n'].replace(0, np.nan)
+    return media.rename(col).reset_index()
+
+
+def aggregate_plan(df, dims):
+    """Plano de agregação do dashboard: todas as tabelas parciais dos gráficos
+    em uma passada sobre as linhas filtradas (detecções ou cubo).
+    Os pesos (contagem, somas e não nulos de cada medida) são preparados uma
+    vez e cada dimensão é acumulada com np.bincount sobre os códigos, sem
+    ordenação nem hash. Retorna {dim: [dim, n_focos, <col>_soma, <col>_n]}."""
+    cubo = is_cube(df)
+    medidas = [c for c in MEDIDAS_CUBO if (f'{c}_soma' if cubo else c) in df.columns]
+
+    if cubo:
+        pesos = {COL_FOCOS: df[COL_FOCOS].to_numpy(np.float64)}
+        for col in medidas:
+            pesos[f'{col}_soma'] = df[f'{col}_soma'].to_numpy(np.float64)
+            pesos[f'{col}_n'] = df[f'{col}_n'].to_numpy(np.float64)
+    else:
+        pesos = {COL_FOCOS: None}
+        for col in medidas:
+            valores = df[col].to_numpy(np.float64, na_value=np.nan)
+            validos = ~np.isnan(valores)
+            pesos[f'{col}_soma'] = np.where(validos, valores, 0.0)
+            pesos[f'{col}_n'] = validos.astype(np.float64)
+
+    tabelas = {}
+    for dim in dims:
+        serie = df[dim]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            rotulos = pd.Categorical.from_codes(np.arange(len(serie.cat.categories)), dtype=serie.dtype)
+        else:
+            codigos, rotulos = pd.factorize(serie, sort=True)
+        # Código 0 recebe os nulos (-1) e é descartado, como no groupby
+        codigos = codigos.astype(np.int64) + 1
+        tamanho = len(rotulos) + 1
+
+        dados = {dim: rotulos}
+        for nome, peso in pesos.items():
+            dados[nome] = np.bincount(codigos, weights=peso, minlength=tamanho)[1:]
+        tabela = pd.DataFrame(dados)
+        tabela[COL_FOCOS] = tabela[COL_FOCOS].astype(np.int64)
+        for col in medidas:
+            tabela[f'{col}_n'] = tabela[f'{col}_n'].astype(np.int64)
+        # observed=True: só os valores presentes nas linhas filtradas
+        tabelas[dim] = tabela[tabela[COL_FOCOS] > 0].reset_index(drop=True)
+    return tabelas
+
+
+def top_rows(df, col, n):
+    """As n linhas de maior col, em ordem decrescente.
+    Seleção parcial (np.argpartition): só as n escolhidas são ordenadas.
+    Como no sort_values, nulos só entram se faltarem valores."""
+    valores = df[col].to_numpy(np.float64, na_value=np.nan)
+    nulos = np.isnan(valores)
+    validos = np.flatnonzero(~nulos)
+    if len(validos) > n:
+        validos = validos[np.argpartition(-valores[validos], n - 1)[:n]]
+    ordem = validos[np.argsort(-valores[validos], kind='stable')]
+    if len(ordem) < n:
+        ordem = np.concatenate([ordem, np.flatnonzero(nulos)[:n - len(ordem)]])
+    return df.iloc[ordem]
+
+
+def group_size(df, by, name):
+    """Número de detecções por by, a partir das detecções ou do cubo."""
+    if not is_cube(df):
+        return df.groupby(by, observed=True).size().reset_index(name=name)
+    return df.groupby(by, observed=True)[COL_FOCOS].sum().reset_index(name=name)
@@ -1,46 +1,495 @@
 # modules/data_loader.py
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import json
 import os
+import threading
+import time
 
-@st.cache_data(show_spinner="Carregando dados...", ttl=3600)
-def load_multiple_years(years):
-    """Carrega e concatena dados de múltiplos anos.
-    Tenta vários padrões de caminho para encontrar o arquivo."""
-    all_data = []
-    errors = []
-    
+from modules.perf import cached_call, instrumented, mark_computed, record
+from modules.sample import year_sample
+from modules.shared_store import SHARED_STORE, shared_frame
+from modules.schema import (
+    SCHEMA_VERSION, COLUNAS_DERIVADAS, TIPO_MES, apply_schema, concat_frames
+)
+from modules.validation import drop_cross_year_duplicates, merge_summaries, validate, write_summary
+
+# Colunas efetivamente usadas pelo dashboard.
+# Do cache colunar só estas são lidas do disco.
+COLUNAS_DASHBOARD = [
+    'DataHora', 'Estado', 'Municipio', 'Bioma',
+    'Precipitacao', 'RiscoFogo', 'FRP', 'Latitude', 'Longitude'
+] + COLUNAS_DERIVADAS
+
+# Carregamento paralelo: número de arquivos lidos ao mesmo tempo.
+# DATABURN_LOAD_WORKERS=1 força a leitura serial (instâncias pequenas).
+LOAD_WORKERS = int(os.environ.get("DATABURN_LOAD_WORKERS", os.cpu_count() or 1))
+# Parser do CSV: "pyarrow" (multi-thread dentro de cada arquivo) ou "c"
+CSV_ENGINE = os.environ.get("DATABURN_CSV_ENGINE", "pyarrow")
+
+# Chaves gravadas nos metadados do Parquet para validar o cache contra o CSV
+_META_TAMANHO = b'databurn.csv_tamanho'
+_META_MTIME = b'databurn.csv_mtime_ns'
+_META_SCHEMA = b'databurn.schema'
+# Ingestão incremental: bytes do CSV já processados, linhas correspondentes
+# e impressão digital do arquivo até esse ponto (detecta reescrita)
+_META_OFFSET = b'databurn.csv_offset'
+_META_LINHAS = b'databurn.csv_linhas'
+_META_DIGEST = b'databurn.csv_digest'
+# Resumo da quarentena (modules/validation.py), acumulado entre ingestões
+_META_QUARENTENA = b'databurn.quarentena'
+
+# Trechos do CSV usados na impressão digital: início e fim da parte já processada
+_BLOCO_DIGEST = 64 * 1024
+
+# Linhagem das leituras incrementais: (path, assinatura nova) -> (assinatura anterior, linhas novas)
+_LINHAGEM = {}
+_LINHAGEM_LOCK = threading.Lock()
+# Falhas ao gravar o cache colunar: (path, assinatura) -> mensagem (relatório de carga)
+_FALHAS_CACHE = {}
+
+
+def _assinatura_csv(path):
+    """Retorna (tamanho, mtime_ns) do CSV, usados como chave do cache colunar."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _caminho_cache(path):
+    """Arquivo de cache ao lado do CSV: dados_2024.csv -> dados_2024.parquet"""
+    return os.path.splitext(path)[0] + '.parquet'
+
+
+def _impressao_csv(f, offset):
+    """Impressão digital dos primeiros offset bytes do CSV: o bloco inicial e
+    o bloco que termina em offset. Se mudar, o arquivo foi reescrito."""
+    h = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    h.update(f.read(min(offset, _BLOCO_DIGEST)))
+    inicio = max(0, offset - _BLOCO_DIGEST)
+    f.seek(inicio)
+    h.update(f.read(offset - inicio))
+    return h.hexdigest().encode()
+
+
+def _fim_linhas_completas(path, tamanho):
+    """Offset logo após o último \\n do CSV (0 se não houver nenhum)."""
+    with open(path, 'rb') as f:
+        fim = tamanho
+        while fim > 0:
+            inicio = max(0, fim - _BLOCO_DIGEST)
+            f.seek(inicio)
+            pos = f.read(fim - inicio).rfind(b'\n')
+            if pos >= 0:
+                return inicio + pos + 1
+            fim = inicio
+    return 0
+
+
+def _tentar_gravar_cache(path, df, cache_path, assinatura, offset, digest, resumo):
+    """_gravar_cache que não interrompe a carga: sem permissão de escrita ou com
+    tipo não suportado, segue sem cache e a falha aparece no relatório de carga
+    (a próxima leitura vai refazer o trabalho)."""
+    chave = (path, assinatura)
+    try:
+        _gravar_cache(df, cache_path, assinatura, offset, digest, resumo)
+    except Exception as e:
+        with _LINHAGEM_LOCK:
+            _FALHAS_CACHE[chave] = f"Cache colunar de {path} não gravado: {e}"
+        return
+    with _LINHAGEM_LOCK:
+        _FALHAS_CACHE.pop(chave, None)
+
+
+def _ler_cache(cache_path, assinatura):
+    """Lê o Parquet de cache se ele corresponder à assinatura do CSV e à
+    versão do schema. Retorna None quando o cache não existe, está
+    corrompido ou desatualizado."""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        schema = pq.read_schema(cache_path)
+        meta = schema.metadata or {}
+        if (meta.get(_META_TAMANHO) != str(assinatura[0]).encode()
+                or meta.get(_META_MTIME) != str(assinatura[1]).encode()
+                or meta.get(_META_SCHEMA) != SCHEMA_VERSION.encode()):
+            return None
+        colunas = [c for c in COLUNAS_DASHBOARD if c in schema.names]
+        df = pd.read_parquet(cache_path, columns=colunas)
+        # O Parquet não preserva categorias não observadas nem sua ordem
+        df['Mes_Nome'] = df['Mes_Nome'].astype(TIPO_MES)
+        return df
+    except Exception:
+        return None
+
+
+def _ler_assinatura_cache(cache_path):
+    """Assinatura (tamanho, mtime_ns) do CSV gravada no cache, ou None."""
+    try:
+        meta = pq.read_schema(cache_path).metadata or {}
+        return int(meta[_META_TAMANHO]), int(meta[_META_MTIME])
+    except Exception:
+        return None
+
+
+def quarantine_summary(cache_path):
+    """Resumo da quarentena gravado no cache colunar do ano, ou None."""
+    try:
+        meta = pq.read_schema(cache_path).metadata or {}
+        return json.loads(meta[_META_QUARENTENA])
+    except Exception:
+        return None
+
+
+def _gravar_cache(df, cache_path, assinatura, offset, digest, resumo=None):
+    """Grava o DataFrame em Parquet com a assinatura do CSV nos metadados.
+    offset/digest marcam até onde o CSV já foi processado (ingestão incremental).
+    A escrita é feita em arquivo temporário + rename para nunca deixar cache pela metade."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = dict(table.schema.metadata or {})
+    meta[_META_TAMANHO] = str(assinatura[0]).encode()
+    meta[_META_MTIME] = str(assinatura[1]).encode()
+    meta[_META_SCHEMA] = SCHEMA_VERSION.encode()
+    meta[_META_OFFSET] = str(offset).encode()
+    meta[_META_LINHAS] = str(len(df)).encode()
+    meta[_META_DIGEST] = digest
+    if resumo is not None:
+        meta[_META_QUARENTENA] = json.dumps(resumo, ensure_ascii=False).encode()
+    table = table.replace_schema_metadata(meta)
+
+    # Temporário único por processo e thread: reconstruções simultâneas do mesmo
+    # ano não escrevem no mesmo arquivo
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # Sem deixar o temporário para trás (a falha vai para o relatório)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_csv(path):
+    """Lê o CSV com o parser configurado, caindo para o parser C se o
+    pyarrow não conseguir interpretar o arquivo."""
+    if CSV_ENGINE == "pyarrow":
+        try:
+            return pd.read_csv(path, sep=',', engine="pyarrow")
+        except Exception:
+            pass
+    return pd.read_csv(path, sep=',')
+
+
+def _ingerir_cauda(path, cache_path, assinatura, year):
+    """Ingestão incremental: se o CSV só cresceu desde o cache, lê apenas as
+    linhas completas acrescentadas, junta ao Parquet e regrava o cache.
+    As linhas novas passam pela validação; repetidas de linhas antigas também
+    vão para a quarentena. Retorna (DataFrame completo, linhas novas), ou None
+    quando o cache não serve de base (inexistente, schema antigo, arquivo
+    truncado ou reescrito)."""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        meta = pq.read_schema(cache_path).metadata or {}
+        if meta.get(_META_SCHEMA) != SCHEMA_VERSION.encode():
+            return None
+        offset = int(meta[_META_OFFSET])
+        linhas = int(meta[_META_LINHAS])
+        digest = meta[_META_DIGEST]
+        resumo = json.loads(meta[_META_QUARENTENA]) if _META_QUARENTENA in meta else None
+    except Exception:
+        return None
+    # Menor ou igual: truncado, ou reescrito com o mesmo tamanho
+    if assinatura[0] <= offset:
+        return None
+
+    with open(path, 'rb') as f:
+        if _impressao_csv(f, offset) != digest:
+            return None
+        f.seek(0)
+        cabecalho = f.readline()
+        f.seek(offset)
+        cauda = f.read(assinatura[0] - offset)
+    # Só linhas completas: uma linha ainda sendo escrita fica para a próxima leitura
+    fim = cauda.rfind(b'\n') + 1
+
+    antigo = pd.read_parquet(cache_path)
+    if len(antigo) != linhas:
+        return None
+    antigo['Mes_Nome'] = antigo['Mes_Nome'].astype(TIPO_MES)
+    if fim == 0:
+        return antigo, 0
+
+    novo = _read_csv(io.BytesIO(cabecalho + cauda[:fim]))
+    novo.columns = novo.columns.str.strip()
+    if list(novo.columns) != [c for c in antigo.columns if c not in COLUNAS_DERIVADAS]:
+        return None # Cabeçalho mudou: reconstrução completa
+    novo, resumo_novo = validate(apply_schema(novo, year), anteriores=antigo)
+    df = concat_frames([antigo, novo])
+    resumo = merge_summaries(resumo, resumo_novo)
+    write_summary(path, year, resumo)
+
+    with open(path, 'rb') as f:
+        digest_novo = _impressao_csv(f, offset + fim)
+    _tentar_gravar_cache(path, df, cache_path, assinatura, offset + fim, digest_novo, resumo)
+    return df, len(novo)
+
+
+def read_year_file(path, year):
+    """Lê o arquivo de um ano passando pelo cache colunar.
+    Na primeira leitura o CSV é lido, tipado pelo schema DataBurn, validado
+    (modules/validation.py) e o Parquet é gravado; nas seguintes só o Parquet
+    (já tipado e limpo) é lido.
+    Se o CSV só recebeu linhas no fim, apenas elas são lidas e juntadas ao
+    Parquet; se foi reescrito ou truncado, o cache é reconstruído do zero.
+    Retorna (DataFrame, origem), onde origem é 'parquet', 'incremental' ou 'csv'."""
+    assinatura = _assinatura_csv(path)
+    cache_path = _caminho_cache(path)
+
+    df = _ler_cache(cache_path, assinatura)
+    if df is not None:
+        return df, 'parquet'
+
+    anterior = _ler_assinatura_cache(cache_path)
+    incremental = _ingerir_cauda(path, cache_path, assinatura, year)
+    if incremental is not None:
+        df, linhas_novas = incremental
+        if anterior is not None:
+            with _LINHAGEM_LOCK:
+                _LINHAGEM[(path, assinatura)] = (anterior, linhas_novas)
+        colunas = [c for c in COLUNAS_DASHBOARD if c in df.columns]
+        return df[colunas], 'incremental'
+
+    # Só linhas completas, como na ingestão incremental: uma última linha ainda
+    # sendo escrita fica para a próxima leitura (a partir do offset gravado)
+    fim = _fim_linhas_completas(path, assinatura[0])
+    if 0 < fim < assinatura[0]:
+        with open(path, 'rb') as f:
+            df = _read_csv(io.BytesIO(f.read(fim)))
+    else:
+        fim = assinatura[0]
+        df = _read_csv(path)
+    # Normaliza nomes de colunas (remove espaços extras)
+    df.columns = df.columns.str.strip()
+    df = apply_schema(df, year)
+    # Sentinelas, faixas e duplicatas: uma vez por versão do arquivo
+    df, resumo = validate(df)
+    write_summary(path, year, resumo)
+
+    with open(path, 'rb') as f:
+        digest = _impressao_csv(f, fim)
+    _tentar_gravar_cache(path, df, cache_path, assinatura, fim, digest, resumo)
+
+    colunas = [c for c in COLUNAS_DASHBOARD if c in df.columns]
+    return df[colunas], 'csv'
+
+
+def find_year_file(year):
+    """Retorna o primeiro caminho existente para o CSV do ano, ou None."""
+    possible_paths = [
+        f"data/db_{year}/dados_{year}.csv", # Padrão original
+        f"dados_{year}.csv" # Apenas o nome
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def _load_year(year, path, assinatura):
+    """Unidade de cache: um único ano.
+    A assinatura (tamanho, mtime) do CSV faz parte da chave, então um arquivo
+    alterado gera uma nova entrada. O DataFrame é compartilhado entre as
+    sessões (cache_resource não copia) e não deve ser modificado.
+    Com DATABURN_SHARED_STORE=1 o DataFrame é um mapeamento do armazenamento
+    compartilhado (modules/shared_store.py), o mesmo em todos os processos.
+    Retorna (DataFrame, origem, resumo da quarentena)."""
+    mark_computed()
+    if SHARED_STORE:
+        leitura = {'origem': 'compartilhado'}
+
+        def construir():
+            df, leitura['origem'] = read_year_file(path, year)
+            df['ano_origem'] = np.int16(year)
+            return df
+
+        versao = f"{assinatura[0]}-{assinatura[1]}-{SCHEMA_VERSION}"
+        df, _ = shared_frame(f"ano_{year}", versao, construir)
+        return df, leitura['origem'], quarantine_summary(_caminho_cache(path))
+
+    df, origem = read_year_file(path, year)
+    df['ano_origem'] = np.int16(year)
+    return df, origem, quarantine_summary(_caminho_cache(path))
+
+
+def _load_year_entry(year):
+    """Carrega um ano e devolve (DataFrame ou None, chave, item do relatório)."""
+    item = {'ano': year, 'arquivo': None, 'origem': None, 'assinatura': None,
+            'anterior': None, 'segundos': 0.0, 'linhas': 0, 'erro': None, 'quarentena': None,
+            'aviso': None, 'amostra': None}
+    path = find_year_file(year)
+    if path is None:
+        item['erro'] = f"Arquivo para o ano {year} não encontrado."
+        return None, None, item
+
+    item['arquivo'] = path
+    inicio = time.perf_counter()
+    try:
+        assinatura = _assinatura_csv(path)
+        (df, origem, item['quarentena']), cache = cached_call(_load_year, year, path, assinatura)
+    except Exception as e:
+        item['erro'] = f"Erro ao ler {path}: {e}"
+        item['segundos'] = time.perf_counter() - inicio
+        return None, None, item
+
+    # Sem leitura nesta chamada: veio do cache em memória
+    item['origem'] = origem if cache == 'miss' else 'memória'
+    item['assinatura'] = assinatura
+    # Ano que só recebeu linhas no fim: (assinatura anterior, linhas novas)
+    item['anterior'] = _LINHAGEM.get((path, assinatura))
+    item['aviso'] = _FALHAS_CACHE.get((path, assinatura))
+    # Amostra do modo aproximado (modules/sample.py): sorteada aqui, uma vez por
+    # versão do arquivo, e não no caminho dos resultados exatos
+    item['amostra'] = year_sample(year, assinatura, df)
+    item['segundos'] = time.perf_counter() - inicio
+    item['linhas'] = len(df)
+    return df, (year, path, assinatura), item
+
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=4)
+def _assemble_years(chave, _frames):
+    """Monta a combinação de anos a partir dos anos já em memória.
+    A chave (anos + assinaturas) identifica a combinação; _frames não é hasheado.
+    Detecções repetidas entre anos (exportações que se sobrepõem) ficam só no
+    primeiro ano. Com o armazenamento compartilhado, a combinação também é um
+    arquivo mapeado: a visão de todos os anos não é copiada em cada processo.
+    Retorna (DataFrame, {ano: linhas repetidas removidas})."""
+    if len(_frames) == 1:
+        return _frames[0], {}
+
+    def montar():
+        return drop_cross_year_duplicates(concat_frames(_frames))[0]
+
+    if SHARED_STORE:
+        anos = "-".join(str(ano) for ano, _, _ in chave)
+        versao = hashlib.blake2b(repr((chave, SCHEMA_VERSION)).encode(), digest_size=8).hexdigest()
+        df = shared_frame(f"anos_{anos}", versao, montar)[0]
+    else:
+        df = montar()
+    # Removidas por ano: linhas de cada arquivo que não chegaram à combinação
+    anos, contagens = np.unique(df['ano_origem'].to_numpy(), return_counts=True)
+    ficaram = dict(zip(anos.tolist(), contagens.tolist()))
+    removidas = {ano: len(frame) - ficaram.get(ano, 0) for (ano, _, _), frame in zip(chave, _frames)}
+    return df, {ano: n for ano, n in removidas.items() if n}
+
+
+@instrumented
+def load_years_with_report(years, workers=None):
+    """Carrega e concatena dados de múltiplos anos, lendo os arquivos em paralelo.
+    Retorna (DataFrame ou None, relatório), onde o relatório tem um dicionário
+    por ano com arquivo, origem, tempo, linhas, erro, resumo da quarentena e
+    a amostra do ano (modo aproximado).
+    workers=1 (ou DATABURN_LOAD_WORKERS=1) faz a leitura serial."""
     # Garante que years é uma lista
     if not isinstance(years, list):
         years = [years]
 
-    for year in years:
-        
-        possible_paths = [
-            f"data/db_{year}/dados_{year}.csv", # Padrão original
-            f"dados_{year}.csv" # Apenas o nome
-        ]
-        
-        file_found = False
-        for path in possible_paths:
-            if os.path.exists(path):
-                try:
-                    df_temp = pd.read_csv(path, sep=',') 
-                    
-                    # Normaliza nomes de colunas (remove espaços extras)
-                    df_temp.columns = df_temp.columns.str.strip()
-                    
-                    df_temp['ano_origem'] = year 
-                    all_data.append(df_temp)
-                    file_found = True
-                    break
-                except Exception as e:
-                    errors.append(f"Erro ao ler {path}: {e}")
-        
-        if not file_found:
-            errors.append(f"Arquivo para o ano {year} não encontrado.")
-            pass
-    
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    return None
\ No newline at end of file
+    if workers is None:
+        workers = LOAD_WORKERS
+    workers = max(1, min(workers, len(years)))
+
+    with st.spinner("Carregando dados..."):
+        if workers == 1:
+            resultados = [_load_year_entry(year) for year in years]
+        else:
+            # As threads herdam o contexto da sessão para que o cache do
+            # Streamlit funcione nelas. O pyarrow libera o GIL durante a leitura.
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(max_workers=workers, initializer=add_script_run_ctx,
+                                    initargs=(None, ctx)) as pool:
+                resultados = list(pool.map(_load_year_entry, years))
+
+    frames = [df for df, _, _ in resultados if df is not None]
+    chave = tuple(c for _, c, _ in resultados if c is not None)
+    relatorio = [item for _, _, item in resultados]
+    for item in relatorio:
+        cache = 'hit' if item['origem'] == 'memória' else f"miss ({item['origem']})"
+        record(f"ler_arquivo[{item['ano']}]", item['segundos'], linhas_saida=item['linhas'], cache=cache)
+
+    if not frames:
+        return None, relatorio
+
+    df, repetidas = _assemble_years(chave, frames)
+    for item in relatorio:
+        if repetidas.get(item['ano']):
+            # Cópia: o resumo do item vem do cache do ano, compartilhado
+            item['quarentena'] = dict(item['quarentena'] or {}, duplicadas_entre_anos=repetidas[item['ano']])
+    # Cópia rasa: quem chama pode adicionar/substituir colunas sem
+    # alterar os frames compartilhados no cache.
+    return df.copy(deep=False), relatorio
+
+
+def load_multiple_years(years):
+    """Carrega e concatena dados de múltiplos anos.
+    Cada ano é lido e cacheado separadamente, então mudar a seleção de anos
+    custa no máximo a leitura dos anos que ainda não estão em memória."""
+    df, _ = load_years_with_report(years)
+    return df
+
+
+def dataset_version(relatorio):
+    """Identificador da versão do conjunto carregado (anos + assinaturas dos CSVs).
+    Usado como chave dos caches derivados, no lugar de hashear o DataFrame."""
+    partes = [
+        f"{item['ano']}:{item['assinatura'][0]}:{item['assinatura'][1]}"
+        for item in relatorio if item['assinatura'] is not None
+    ]
+    return "|".join(partes)
+
+
+def previous_version(relatorio):
+    """Se o conjunto é o anterior mais linhas acrescentadas no fim do último
+    ano, retorna (versão anterior, linhas novas); senão None.
+    Usado para atualizar as estruturas derivadas só com as linhas novas."""
+    carregados = [item for item in relatorio if item['assinatura'] is not None]
+    crescidos = [item for item in carregados if item['anterior'] is not None]
+    if len(crescidos) != 1 or crescidos[0] is not carregados[-1]:
+        return None
+    assinatura_anterior, linhas_novas = crescidos[0]['anterior']
+    anterior = [dict(item) for item in carregados]
+    anterior[-1]['assinatura'] = assinatura_anterior
+    return dataset_version(anterior), linhas_novas
+
+
+def _cache_corresponde(item):
+    """O Parquet do ano tem os mesmos dados que foram carregados: mesma
+    assinatura do CSV e mesmo número de linhas. Não vale quando a gravação
+    falhou (o arquivo é de uma versão anterior do CSV, ou não existe)."""
+    if item.get('aviso'):
+        return False
+    try:
+        meta = pq.read_schema(_caminho_cache(item['arquivo'])).metadata or {}
+        return ((int(meta[_META_TAMANHO]), int(meta[_META_MTIME])) == tuple(item['assinatura'])
+                and int(meta[_META_LINHAS]) == item['linhas'])
+    except Exception:
+        return False
+
+
+def columnar_sources(relatorio):
+    """(ano, arquivo Parquet do cache colunar) dos anos carregados, na ordem da
+    montagem dos anos, para consultas diretas. Lista vazia se o Parquet de
+    algum ano não corresponde ao que está em memória: consultas nos arquivos
+    responderiam com dados diferentes dos da tabela e do mapa."""
+    carregados = [item for item in relatorio if item['assinatura'] is not None]
+    if not all(_cache_corresponde(item) for item in carregados):
+        return []
+    return [(item['ano'], _caminho_cache(item['arquivo'])) for item in carregados]
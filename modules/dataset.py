@@ -0,0 +1,109 @@
+# modules/dataset.py
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from modules import perf
+from modules.cube import build_cube, merge_cubes
+from modules.spatial import build_grid, build_spatial_index, merge_grids
+from modules.temporal import build_daily_cube, build_time_index, merge_daily
+from modules.ui import build_filter_index
+
+""" Etapa de "dataset preparado": fica entre a carga e os filtros.
+Roda uma vez por versão dos dados e o resultado é somente leitura."""
+
+# Últimos datasets preparados, por versão: base para acrescentar linhas novas
+# (ingestão incremental) sem reagregar o conjunto inteiro
+_RECENTES = OrderedDict()
+_RECENTES_MAX = 2
+_RECENTES_LOCK = threading.Lock()
+# Versões no cache de prepare_dataset (modo aproximado: o exato já está pronto?),
+# na mesma ordem LRU e com o mesmo limite do cache
+_PREPARADAS = OrderedDict()
+MAX_PREPARADOS = 4
+
+
+def is_prepared(versao):
+    """True se o dataset desta versão está no cache deste processo."""
+    with _RECENTES_LOCK:
+        return versao in _PREPARADAS
+
+
+def _base_incremental(anterior, _df):
+    """Dataset preparado da versão anterior, se _df for ele + linhas no fim."""
+    if anterior is None:
+        return None
+    versao_anterior, linhas_novas = anterior
+    with _RECENTES_LOCK:
+        base = _RECENTES.get(versao_anterior)
+    if base is None or len(base['df']) + linhas_novas != len(_df):
+        return None
+    return base
+
+
+@st.cache_resource(show_spinner="Preparando dados...", max_entries=MAX_PREPARADOS)
+def _prepare_dataset(versao, _df, col_estado, col_cidade, _anterior=None):
+    """Monta as estruturas derivadas do conjunto carregado.
+    versao (modules.data_loader.dataset_version) é a chave do cache; _df não é hasheado.
+    _anterior (modules.data_loader.previous_version) indica que _df é uma versão
+    já preparada mais linhas no fim: cubo e grade recebem só as linhas novas.
+
+    Retorna um dicionário com:
+      df    -> detecções já tipadas (modules/schema.py)
+      cube  -> cubo de agregação (modules/cube.py)
+      grade -> grade espacial do mapa de calor (modules/spatial.py)
+      index -> índice dos filtros de Estado/Cidade (modules/ui.py)
+      tempo -> índice das linhas ordenadas por DataHora (modules/temporal.py)
+      diario -> cubo diário dos gráficos por período (modules/temporal.py)
+      espaco -> índice espacial dos recortes de região (modules/spatial.py)
+
+    O resultado é compartilhado entre sessões e reruns: nenhuma etapa
+    seguinte (filtros, gráficos) pode alterar esses objetos."""
+    perf.mark_computed()
+    base = _base_incremental(_anterior, _df)
+    if base is None:
+        cube = build_cube(_df)
+        grade = build_grid(_df) if 'Latitude' in _df.columns else None
+        diario = build_daily_cube(_df)
+    else:
+        novas = _df.iloc[len(base['df']):]
+        cube = merge_cubes(base['cube'], build_cube(novas))
+        grade = None if base['grade'] is None else merge_grids(base['grade'], build_grid(novas))
+        diario = None if base['diario'] is None else merge_daily(base['diario'], build_daily_cube(novas))
+
+    dados = {
+        'versao': versao,
+        'df': _df,
+        'cube': cube,
+        'grade': grade,
+        'index': build_filter_index(_df, col_estado, col_cidade),
+        'tempo': build_time_index(_df),
+        'diario': diario,
+        'espaco': build_spatial_index(_df),
+    }
+    with _RECENTES_LOCK:
+        _RECENTES[versao] = dados
+        while len(_RECENTES) > _RECENTES_MAX:
+            _RECENTES.popitem(last=False)
+    return dados
+
+
+def prepare_dataset(versao, df, col_estado, col_cidade, anterior=None):
+    """Dataset preparado da versão (ver _prepare_dataset), com cache.
+    Cada acesso atualiza a ordem LRU usada por is_prepared."""
+    dados = _prepare_dataset(versao, df, col_estado, col_cidade, anterior)
+    with _RECENTES_LOCK:
+        _PREPARADAS[versao] = True
+        _PREPARADAS.move_to_end(versao)
+        while len(_PREPARADAS) > MAX_PREPARADOS:
+            _PREPARADAS.popitem(last=False)
+    return dados
+
+
+def clear_prepared():
+    """Esvazia o cache dos datasets preparados (benchmark)."""
+    _prepare_dataset.clear()
+    with _RECENTES_LOCK:
+        _PREPARADAS.clear()
+        _RECENTES.clear()
@@ -0,0 +1,90 @@
+# modules/figure_cache.py
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from modules import perf
+
+""" Cache das figuras prontas (Plotly e PyDeck).
+A chave é o estado dos filtros (versão dos dados, backend, Estado, Cidade e
+parâmetros do gráfico), nunca o DataFrame: um acerto não agrega nem monta nada.
+Compartilhado entre reruns e sessões, com descarte LRU e limite de memória."""
+
+FIGURE_CACHE_MB = float(os.environ.get("DATABURN_FIGURE_CACHE_MB", "64"))
+FIGURE_CACHE_ENTRIES = int(os.environ.get("DATABURN_FIGURE_CACHE_ENTRIES", "256"))
+
+
+def _tamanho(obj):
+    """Tamanho aproximado da figura em bytes (serializada)."""
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(obj)
+
+
+class FigureCache:
+    """LRU por número de entradas e por bytes. Seguro entre threads (sessões)."""
+
+    def __init__(self, max_mb=FIGURE_CACHE_MB, max_entries=FIGURE_CACHE_ENTRIES):
+        self.max_bytes = int(max_mb * 1e6)
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict() # chave -> (figura, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def put(self, chave, figura):
+        tamanho = _tamanho(figura)
+        if tamanho > self.max_bytes:
+            return # Maior que o cache inteiro: não guarda
+        with self._lock:
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (figura, tamanho)
+            self.bytes += tamanho
+            while self._itens and (self.bytes > self.max_bytes or len(self._itens) > self.max_entries):
+                _, (_, descartado) = self._itens.popitem(last=False)
+                self.bytes -= descartado
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Instância única no processo, compartilhada por todas as sessões."""
+    return FigureCache()
+
+
+def cached_figure(nome, chave, construir):
+    """Retorna a figura da chave; na falta, chama construir() e guarda o resultado.
+    As figuras guardadas são somente leitura: quem recebe não pode alterá-las."""
+    cache = get_figure_cache()
+    chave = (nome,) + tuple(chave)
+    with perf.stage(f"figura:{nome}") as etapa:
+        figura = cache.get(chave)
+        etapa['cache'] = 'miss' if figura is None else 'hit'
+        if figura is None:
+            figura = construir()
+            cache.put(chave, figura)
+    return figura
@@ -1,24 +1,52 @@
-import plotly.express as px
 import pandas as pd
-import pydeck as pdk
 import streamlit as st
 
+from modules.cube import group_mean, group_size, top_rows
+from modules.sample import is_estimate, mean_interval
+from modules.spatial import heatmap_cells, region_view
+from modules.temporal import add_periods
+from modules.perf import instrumented
+
+# plotly.express e pydeck são importados dentro das funções: só quem desenha
+# paga a importação (partida a frio mais rápida e figuras em cache não importam nada)
+
 # Configuração Global de Fontes
 FONT_CONFIG = dict(family="sans serif", size=14, color="#333333")
-
+# Acima disso (granularidade diária/semanal) não há marcadores nem rótulos nas barras
+MAX_PONTOS_ROTULADOS = 60
+
+def _categorias_para_texto(df_grouped, col):
+    """Converte a coluna categórica do resultado agregado para texto.
+    O agrupamento roda sobre os códigos; o Plotly recebe só os rótulos usados."""
+    if isinstance(df_grouped[col].dtype, pd.CategoricalDtype):
+        df_grouped[col] = df_grouped[col].astype(str)
+    return df_grouped
+
+def _com_periodo(df, col):
+    """Detecções sem a coluna de período pedida: deriva de DataHora."""
+    if col not in df.columns and 'DataHora' in df.columns:
+        return add_periods(df, [col], 'DataHora')
+    return df
+
+@instrumented
 def plot_line_evolution(df, x_col, y_col, title, color_hex="#E25822", template="plotly_white"):
-    """Gera gráfico de linha"""
+    """Gera gráfico de linha. df pode ser o cubo (modules/cube.py) ou as detecções.
+    x_col pode ser Ano, Mes_Nome ou uma granularidade de modules/temporal.py
+    (Dia, Semana, Mes); nas detecções ela é derivada de DataHora."""
+    import plotly.express as px
     try:
-        df_grouped = df.groupby(x_col, sort=False)[y_col].mean().reset_index()
+        df_grouped = group_mean(_com_periodo(df, x_col), x_col, y_col)
+        df_grouped = _categorias_para_texto(df_grouped, x_col)
     except Exception as e:
         st.error(f"Erro ao agrupar: {e}")
         return None
 
+    marcadores = len(df_grouped) <= MAX_PONTOS_ROTULADOS
     fig = px.line(
-        df_grouped, x=x_col, y=y_col, title=f"<b>{title}</b>", markers=True
+        df_grouped, x=x_col, y=y_col, title=f"<b>{title}</b>", markers=marcadores
     )
     
-    fig.update_traces(line_color=color_hex, line_width=4, marker_size=8)
+    fig.update_traces(line_color=color_hex, line_width=4 if marcadores else 2, marker_size=8)
     
     fig.update_layout(
         hovermode="x unified",
@@ -41,22 +69,35 @@ def plot_line_evolution(df, x_col, y_col, title, color_hex="#E25822", template="
         
     return fig
 
+@instrumented
 def plot_bar_ranking(df, cat_col, val_col, title, top_n=10, color_seq="Blues", is_percent=False, template="plotly_white"):
-    """Gera ranking horizontal."""
-    df_grouped = df.groupby(cat_col)[val_col].mean().reset_index()
+    """Gera ranking horizontal. df pode ser o cubo ou as detecções.
+    Com uma tabela estimada (modules/sample.py), as barras mostram o intervalo de 95%."""
+    import plotly.express as px
+    estimativa = is_estimate(df)
+    col_ic = f'{val_col}_ic'
+    if estimativa:
+        df_grouped = mean_interval(df, cat_col, val_col)
+    else:
+        df_grouped = group_mean(df, cat_col, val_col)
+    df_grouped = _categorias_para_texto(df_grouped, cat_col)
     
     if is_percent:
         df_grouped[val_col] = df_grouped[val_col] * 100
+        if estimativa:
+            df_grouped[col_ic] = df_grouped[col_ic] * 100
         formato = '.1f'
     else:
         formato = '.2f'
 
-    df_top = df_grouped.sort_values(by=val_col, ascending=False).head(top_n)
+    # Seleção parcial do top N: não ordena todos os municípios
+    df_top = top_rows(df_grouped, val_col, top_n)
 
     fig = px.bar(
         df_top, x=val_col, y=cat_col, title=f"<b>{title}</b>",
         text_auto=formato, orientation='h',
-        color=val_col, color_continuous_scale=color_seq 
+        color=val_col, color_continuous_scale=color_seq,
+        error_x=col_ic if estimativa else None
     )
 
     fig.update_layout(
@@ -79,16 +120,20 @@ def plot_bar_ranking(df, cat_col, val_col, title, top_n=10, color_seq="Blues", i
 
     return fig
 
+@instrumented
 def plot_seasonal_volume(df, time_col, title, color_seq="Reds", template="plotly_white"):
     """
-    Gráfico de Sazonalidade.
+    Gráfico de Sazonalidade. df pode ser o cubo ou as detecções.
+    time_col: Mes_Nome (mês do ano), Ano ou Dia/Semana/Mes (modules/temporal.py).
     """
-    df_grouped = df.groupby(time_col, sort=False).size().reset_index(name='Quantidade de Focos')
+    import plotly.express as px
+    df_grouped = group_size(_com_periodo(df, time_col), time_col, 'Quantidade de Focos')
+    df_grouped = _categorias_para_texto(df_grouped, time_col)
     
     fig = px.bar(
         df_grouped, x=time_col, y='Quantidade de Focos',
         title=f"<b>{title}</b>", color='Quantidade de Focos',
-        color_continuous_scale=color_seq, text_auto=True
+        color_continuous_scale=color_seq, text_auto=len(df_grouped) <= MAX_PONTOS_ROTULADOS
     )
     
     fig.update_layout(
@@ -106,29 +151,47 @@ def plot_seasonal_volume(df, time_col, title, color_seq="Reds", template="plotly
     )
     return fig
 
-def plot_map_density(df, lat_col, lon_col, map_style=None):
+def _contorno_regiao(pdk, regiao):
+    """Camada com o contorno do recorte: retângulo ou círculo (raio em metros)."""
+    if regiao[0] == 'raio':
+        _, lat, lon, km = regiao
+        return pdk.Layer(
+            "ScatterplotLayer", data=[{"lon": lon, "lat": lat}], get_position=["lon", "lat"],
+            get_radius=km * 1000, filled=False, stroked=True,
+            get_line_color=[60, 60, 60], line_width_min_pixels=2,
+        )
+    _, sul, norte, oeste, leste = regiao
+    return pdk.Layer(
+        "PolygonLayer", data=[{"contorno": [[oeste, sul], [leste, sul], [leste, norte], [oeste, norte]]}],
+        get_polygon="contorno", filled=False, stroked=True,
+        get_line_color=[60, 60, 60], line_width_min_pixels=2,
+    )
+
+@instrumented
+def plot_map_density(df, lat_col, lon_col, map_style=None, zoom=5, regiao=None):
     """
     Gera um mapa otimizado usando PyDeck (WebGL).
     Substituindo o Plotly Density para evitar estouro de memória.
+    df pode ser a grade pré-calculada (modules/spatial.py) ou as detecções:
+    o navegador recebe só as células da grade, com FRP somado, em vez de pontos.
+    Com um recorte de região (modules/spatial.py), o mapa é enquadrado nele e
+    o contorno é desenhado.
     """
+    import pydeck as pdk
 
-    limit = 20000
-    if len(df) > limit:
-        data = df.sample(n=limit)
-    else:
-        data = df
+    # Define o ponto inicial da câmera (Centralizado no Maranhão ou na região)
+    latitude, longitude = -5.0, -45.0
+    if regiao is not None:
+        latitude, longitude, zoom = region_view(regiao)
 
-    # Ajuste de peso (Intensidade)
-    if 'FRP' in data.columns:
-        data['FRP'] = data['FRP'].fillna(1) # Garante que não tem NaN
-    else:
-        data['FRP'] = 1
+    # Agregação em grade: determinística e cobre todas as detecções.
+    # O tamanho da célula acompanha o zoom inicial do mapa.
+    data = heatmap_cells(df, lat_col, lon_col, zoom)
 
-    # Define o ponto inicial da câmera (Centralizado no Maranhão)
     view_state = pdk.ViewState(
-        latitude=-5.0,
-        longitude=-45.0,
-        zoom=5,
+        latitude=latitude,
+        longitude=longitude,
+        zoom=zoom,
         pitch=0 # Inclinação 0 para ver de cima (como mapa tradicional)
     )
 
@@ -137,17 +200,21 @@ def plot_map_density(df, lat_col, lon_col, map_style=None):
         "HeatmapLayer",
         data=data,
         get_position=[lon_col, lat_col],
-        get_weight="FRP", # Peso baseado na intensidade do fogo
+        get_weight="FRP", # Peso: FRP somado da célula (intensidade do fogo)
         opacity=0.6,
         radius_pixels=40, # Raio da mancha
         intensity=1,
         threshold=0.05,
     )
 
+    camadas = [layer]
+    if regiao is not None:
+        camadas.append(_contorno_regiao(pdk, regiao))
+
     # Renderização
     # map_style='light' usa o mapa claro padrão do PyDeck
     deck = pdk.Deck(
-        layers=[layer],
+        layers=camadas,
         initial_view_state=view_state,
         map_style="light", # Força mapa claro para combinar com o tema
         tooltip={"text": "Concentração de Focos"}
@@ -155,9 +222,12 @@ def plot_map_density(df, lat_col, lon_col, map_style=None):
     
     return deck
 
+@instrumented
 def plot_biome_distribution(df, biome_col, template="plotly_white"):
-    """Gráfico de Rosca."""
-    df_grouped = df.groupby(biome_col).size().reset_index(name='Contagem')
+    """Gráfico de Rosca. df pode ser o cubo ou as detecções."""
+    import plotly.express as px
+    df_grouped = group_size(df, biome_col, 'Contagem')
+    df_grouped = _categorias_para_texto(df_grouped, biome_col)
     
     fig = px.pie(
         df_grouped, names=biome_col, values='Contagem', hole=0.5,
@@ -0,0 +1,181 @@
+# modules/perf.py
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+""" Instrumentação opcional dos caminhos críticos do dashboard.
+Ativa com DATABURN_PERF=1 ou ?perf=1 na URL. Cada rerun registra, por etapa,
+tempo, linhas de entrada/saída, acerto de cache e variação de memória;
+o resultado aparece na sidebar e é gravado em um log JSON-lines."""
+
+PERF_LOG = os.environ.get("DATABURN_PERF_LOG", "logs/perf.jsonl")
+
+# Por thread: a função com cache executou nesta chamada? (ver cached_call)
+_LOCAL = threading.local()
+
+
+def _rss_mb():
+    """Memória residente do processo (MB). Só no Linux; None nos demais."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def is_enabled():
+    try:
+        return bool(st.session_state.get('perf_ativo', False))
+    except Exception:
+        return False # Fora do Streamlit (scripts, benchmark)
+
+
+def start_run():
+    """Chamado no início de cada rerun: decide se a instrumentação está ativa e zera as etapas."""
+    ativo = os.environ.get("DATABURN_PERF") == "1" or st.query_params.get("perf") == "1"
+    st.session_state['perf_ativo'] = ativo
+    st.session_state['perf_etapas'] = []
+    st.session_state['perf_inicio'] = time.perf_counter()
+    st.session_state['perf_reruns'] = st.session_state.get('perf_reruns', 0) + 1
+
+
+def record(etapa, segundos, linhas_entrada=None, linhas_saida=None, cache=None, memoria_mb=None):
+    """Registra uma etapa já medida (ex.: itens do relatório de carga)."""
+    if not is_enabled():
+        return
+    st.session_state['perf_etapas'].append({
+        'etapa': etapa,
+        'segundos': round(segundos, 4),
+        'linhas_entrada': linhas_entrada,
+        'linhas_saida': linhas_saida,
+        'cache': cache,
+        'memoria_mb': None if memoria_mb is None else round(memoria_mb, 1),
+    })
+
+
+def _linhas(obj):
+    """Número de linhas de um DataFrame (ou do primeiro item de uma tupla)."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    return len(obj) if isinstance(obj, pd.DataFrame) else None
+
+
+@contextmanager
+def stage(etapa, linhas_entrada=None, cache=None):
+    """Mede o bloco. O dicionário retornado aceita 'linhas_saida' e 'cache'
+    definidos dentro do bloco."""
+    info = {'linhas_saida': None, 'cache': cache}
+    if not is_enabled():
+        yield info
+        return
+
+    rss = _rss_mb()
+    inicio = time.perf_counter()
+    try:
+        yield info
+    finally:
+        rss_fim = _rss_mb()
+        record(
+            etapa, time.perf_counter() - inicio, linhas_entrada, info['linhas_saida'], info['cache'],
+            None if rss is None or rss_fim is None else rss_fim - rss,
+        )
+
+
+def mark_computed():
+    """Chamada no corpo de uma função com st.cache_*: o resultado foi calculado (miss)."""
+    _LOCAL.calculado = True
+
+
+def cached_call(funcao, *args, **kwargs):
+    """Chama uma função com cache que usa mark_computed().
+    Retorna (resultado, 'hit' ou 'miss')."""
+    _LOCAL.calculado = False
+    resultado = funcao(*args, **kwargs)
+    return resultado, 'miss' if _LOCAL.calculado else 'hit'
+
+
+def instrumented(func):
+    """Decorador: mede a função como uma etapa com o nome dela.
+    As linhas de entrada/saída vêm do primeiro argumento e do retorno."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_enabled():
+            return func(*args, **kwargs)
+        with stage(func.__name__, linhas_entrada=_linhas(args[0]) if args else None) as info:
+            resultado = func(*args, **kwargs)
+            info['linhas_saida'] = _linhas(resultado)
+        return resultado
+    return wrapper
+
+
+def _sessao():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx().session_id
+    except Exception:
+        return None
+
+
+def _rerun_de_fragmento():
+    """True se o rerun atual executa só fragmentos (st.fragment), não a página."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return bool(get_script_run_ctx().fragment_ids_this_run)
+    except Exception:
+        return False
+
+
+def fragment(func):
+    """Decorador dos blocos que viram st.fragment: um rerun só do fragmento é
+    medido como um rerun próprio, marcado com o nome da função. Na execução
+    da página inteira o bloco entra no rerun da página."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _rerun_de_fragmento():
+            return func(*args, **kwargs)
+        start_run()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            finish_run(fragmento=func.__name__)
+    return wrapper
+
+
+def finish_run(fragmento=None):
+    """Chamado no fim do rerun: mostra o painel na sidebar e grava uma linha no log.
+    Num rerun de fragmento só o log é gravado (fragmentos não escrevem na sidebar)."""
+    if not is_enabled():
+        return
+    etapas = st.session_state['perf_etapas']
+    total = time.perf_counter() - st.session_state['perf_inicio']
+
+    if fragmento is None:
+        with st.sidebar.expander(f"⏱️ Desempenho do rerun ({total:.2f}s)"):
+            if etapas:
+                st.dataframe(pd.DataFrame(etapas), hide_index=True, use_container_width=True)
+            st.caption(f"Rerun nº {st.session_state['perf_reruns']} · log em {PERF_LOG}")
+
+    registro = {
+        'ts': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'sessao': _sessao(),
+        'rerun': st.session_state['perf_reruns'],
+        'fragmento': fragmento,
+        'total_segundos': round(total, 4),
+        'rss_mb': _rss_mb(),
+        'etapas': etapas,
+    }
+    try:
+        pasta = os.path.dirname(PERF_LOG)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with open(PERF_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError:
+        pass # Log é opcional: o painel continua funcionando
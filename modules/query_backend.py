@@ -0,0 +1,276 @@
+# modules/query_backend.py
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import streamlit as st
+
+from modules.cube import COL_FOCOS, MEDIDAS_CUBO, aggregate_plan
+from modules.schema import TIPO_MES, concat_frames
+from modules.spatial import GRADE_BASE, build_grid, region_bbox, region_mask
+from modules.temporal import COLUNAS_PERIODO, add_periods, period_bounds, slice_daily
+from modules.ui import apply_location_filter
+from modules.validation import cross_year_duplicates
+
+""" Backends de consulta dos gráficos.
+Os dois respondem às mesmas perguntas (agregação por uma dimensão e grade do
+mapa, já filtradas por Estado/Cidade, período e região) no formato do cubo
+(modules/cube.py), que os gráficos já aceitam. As dimensões incluem as
+granularidades de modules/temporal.py (Dia, Semana, Mes):
+  pandas -> referência, a partir do dataset preparado em memória
+  arrow  -> pushdown com pyarrow.dataset direto nos arquivos Parquet dos anos;
+            só o resultado agregado é materializado"""
+
+# Escolha do backend: DATABURN_QUERY_BACKEND=pandas (padrão) ou arrow
+QUERY_BACKEND = os.environ.get("DATABURN_QUERY_BACKEND", "pandas")
+
+COL_ESTADO = 'Estado'
+COL_CIDADE = 'Municipio'
+
+
+class PandasBackend:
+    """Referência: filtra e re-agrega o cubo e a grade do dataset preparado.
+    Com período ou granularidade abaixo do mês, usa o cubo diário; com recorte
+    de região (os cubos não têm coordenadas), as linhas dos índices."""
+
+    nome = "pandas"
+
+    def __init__(self, dados):
+        self.cube = dados['cube']
+        self.grade = dados['grade']
+        self.diario = dados.get('diario')
+        self.df = dados['df']
+        self.index = dados['index']
+        self.tempo = dados.get('tempo')
+        self.espaco = dados.get('espaco')
+
+    def _filtrar(self, tabela, estado_sel, cidade_sel):
+        if estado_sel != "Todos":
+            tabela = tabela[tabela[COL_ESTADO] == estado_sel]
+        if cidade_sel != "Todas":
+            tabela = tabela[tabela[COL_CIDADE] == cidade_sel]
+        return tabela
+
+    def _cubo(self, dims, periodo):
+        if self.diario is None or (periodo is None and not any(d in COLUNAS_PERIODO for d in dims)):
+            return self.cube
+        # Período: fatia contígua do cubo diário (ordenado por Dia)
+        return self.diario if periodo is None else slice_daily(self.diario, periodo)
+
+    def _linhas(self, estado_sel, cidade_sel, periodo, regiao):
+        linhas, _ = apply_location_filter(
+            self.df, self.index, COL_ESTADO, COL_CIDADE, estado_sel, cidade_sel,
+            periodo=periodo, tempo=self.tempo, regiao=regiao, espaco=self.espaco
+        )
+        return linhas
+
+    def aggregate_many(self, dims, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Plano de agregação: filtra o cubo uma vez e monta a tabela de cada
+        dimensão na mesma passada (modules/cube.py:aggregate_plan)."""
+        if regiao is not None and self.espaco is not None:
+            linhas = self._linhas(estado_sel, cidade_sel, periodo, regiao)
+            return aggregate_plan(add_periods(linhas, dims, 'DataHora'), dims)
+        cubo = self._filtrar(self._cubo(dims, periodo), estado_sel, cidade_sel)
+        if 'Dia' in cubo.columns:
+            cubo = add_periods(cubo, dims, 'Dia')
+        return aggregate_plan(cubo, dims)
+
+    def aggregate(self, by, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Cubo agregado por by: [by, n_focos, <medida>_soma, <medida>_n]"""
+        return self.aggregate_many([by], estado_sel, cidade_sel, periodo, regiao)[by]
+
+    def grid(self, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Grade do mapa: [ix, iy, FRP, n_focos]"""
+        if self.grade is None:
+            return None
+        if (periodo is not None and self.tempo is not None) or (regiao is not None and self.espaco is not None):
+            # A grade pré-calculada não tem tempo nem recorte: só as linhas selecionadas
+            grade = build_grid(self._linhas(estado_sel, cidade_sel, periodo, regiao), dims=[])
+        else:
+            grade = self._filtrar(self.grade, estado_sel, cidade_sel)
+        return grade.groupby(['ix', 'iy'], sort=False)[['FRP', COL_FOCOS]].sum().reset_index()
+
+
+def _repetidas_entre_anos(fontes, colunas):
+    """Tabela (pyarrow.dataset em memória) das detecções que a montagem dos anos
+    descarta por serem repetidas entre arquivos (modules/validation.py), ou None.
+    Só as linhas dos anos que aparecem fora do próprio arquivo são lidas."""
+    suspeitos = set()
+    for ano, arquivo in fontes:
+        anos = ds.dataset(arquivo, format="parquet").to_table(columns=['Ano'])['Ano']
+        suspeitos.update(v for v in pc.unique(anos).to_pylist() if v is not None and v != ano)
+    if not suspeitos:
+        return None
+
+    frames = []
+    for ano, arquivo in fontes:
+        dataset = ds.dataset(arquivo, format="parquet")
+        nomes = [c for c in colunas if c in dataset.schema.names]
+        df = dataset.to_table(columns=nomes, filter=ds.field('Ano').isin(sorted(suspeitos))).to_pandas()
+        df['ano_origem'] = np.int16(ano)
+        frames.append(df)
+    df = concat_frames(frames)
+    repetidas = df[cross_year_duplicates(df)].drop(columns='ano_origem')
+    if repetidas.empty:
+        return None
+    return ds.dataset(pa.Table.from_pandas(repetidas, preserve_index=False))
+
+
+def _descontar(total, repetidas, chaves):
+    """total - repetidas, grupo a grupo (as agregações são somas e contagens).
+    Grupos que ficam sem detecções saem, como no conjunto sem as repetidas."""
+    if repetidas.empty:
+        return total
+    # Soma de um grupo só com nulos vem nula do Arrow: conta como 0
+    resultado = total.set_index(chaves).fillna(0)
+    menos = repetidas.set_index(chaves).reindex(resultado.index).fillna(0)
+    resultado = resultado - menos
+    contagens = [COL_FOCOS] + [c for c in resultado.columns if c.endswith('_n')]
+    resultado[contagens] = resultado[contagens].round().astype(np.int64)
+    for col in [c[:-2] for c in contagens[1:]]:
+        # Sem valores válidos a soma é 0, não um resíduo de ponto flutuante
+        resultado.loc[resultado[f'{col}_n'] == 0, f'{col}_soma'] = 0.0
+    return resultado[resultado[COL_FOCOS] > 0].reset_index()
+
+
+class ArrowBackend:
+    """Pushdown com pyarrow.dataset: filtro e projeção são aplicados na leitura
+    dos Parquet (só as colunas e row groups necessários) e o group-by roda no
+    Arrow. Não mantém as detecções em memória. Os Parquet já vêm validados;
+    as repetidas entre anos, que ficam nos arquivos mas não na montagem dos
+    anos, são agregadas com os mesmos filtros e descontadas do resultado."""
+
+    nome = "arrow"
+
+    def __init__(self, fontes, colunas=None):
+        """fontes: (ano, Parquet) na ordem da montagem (data_loader.columnar_sources).
+        colunas: colunas consultáveis (padrão: todas as do schema)."""
+        self.dataset = ds.dataset([arquivo for _, arquivo in fontes], format="parquet")
+        self.repetidas = _repetidas_entre_anos(fontes, colunas or self.dataset.schema.names)
+
+    def _filtro(self, estado_sel, cidade_sel, periodo=None, regiao=None):
+        condicoes = []
+        if estado_sel != "Todos":
+            condicoes.append(ds.field(COL_ESTADO) == estado_sel)
+        if cidade_sel != "Todas":
+            condicoes.append(ds.field(COL_CIDADE) == cidade_sel)
+        if periodo is not None:
+            # Estatísticas dos row groups descartam o que está fora do período
+            inicio, fim = period_bounds(periodo)
+            condicoes.append(ds.field('DataHora') >= pa.scalar(inicio))
+            condicoes.append(ds.field('DataHora') < pa.scalar(fim))
+        if regiao is not None:
+            # Retângulo que contém a região; o raio é conferido depois da leitura
+            sul, norte, oeste, leste = region_bbox(regiao)
+            condicoes.append(ds.field('Latitude').cast(pa.float64()) >= sul)
+            condicoes.append(ds.field('Latitude').cast(pa.float64()) <= norte)
+            condicoes.append(ds.field('Longitude').cast(pa.float64()) >= oeste)
+            condicoes.append(ds.field('Longitude').cast(pa.float64()) <= leste)
+        filtro = None
+        for cond in condicoes:
+            filtro = cond if filtro is None else filtro & cond
+        return filtro
+
+    @staticmethod
+    def _ler(dataset, colunas, filtro, regiao):
+        """to_table com o filtro; um recorte de raio é conferido no resultado."""
+        if regiao is None or regiao[0] != 'raio':
+            return dataset.to_table(columns=colunas, filter=filtro)
+        coords = {'_lat': ds.field('Latitude').cast(pa.float64()), '_lon': ds.field('Longitude').cast(pa.float64())}
+        tabela = dataset.to_table(columns={**colunas, **coords}, filter=filtro)
+        dentro = region_mask(tabela['_lat'].to_numpy(), tabela['_lon'].to_numpy(), regiao)
+        return tabela.filter(pa.array(dentro)).drop_columns(['_lat', '_lon'])
+
+    def aggregate_many(self, dims, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Plano de agregação: uma leitura dos arquivos com todas as dimensões
+        e medidas pedidas; cada tabela é agrupada sobre o resultado em memória."""
+        medidas = [c for c in MEDIDAS_CUBO if c in self.dataset.schema.names]
+        colunas = {}
+        for dim in dims:
+            if dim in COLUNAS_PERIODO:
+                colunas[dim] = self._periodo(dim)
+                continue
+            colunas[dim] = ds.field(dim)
+            if pa.types.is_dictionary(self.dataset.schema.field(dim).type):
+                # Cada arquivo tem o próprio dicionário: agrupa pelo texto
+                colunas[dim] = ds.field(dim).cast(pa.string())
+        for col in medidas:
+            colunas[col] = ds.field(col).cast(pa.float64())
+
+        filtro = self._filtro(estado_sel, cidade_sel, periodo, regiao)
+        tabela = self._ler(self.dataset, colunas, filtro, regiao)
+        plano = {dim: self._agrupar(tabela, dim, medidas) for dim in dims}
+        if self.repetidas is not None:
+            repetidas = self._ler(self.repetidas, colunas, filtro, regiao)
+            plano = {dim: _descontar(plano[dim], self._agrupar(repetidas, dim, medidas), [dim]) for dim in dims}
+        return plano
+
+    def aggregate(self, by, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Mesmo resultado de PandasBackend.aggregate, calculado nos arquivos."""
+        return self.aggregate_many([by], estado_sel, cidade_sel, periodo, regiao)[by]
+
+    @staticmethod
+    def _periodo(dim):
+        """Início do dia/semana (segunda-feira)/mês, calculado na leitura."""
+        if dim == 'Semana':
+            return pc.floor_temporal(ds.field('DataHora'), unit='week', week_starts_monday=True)
+        return pc.floor_temporal(ds.field('DataHora'), unit='day' if dim == 'Dia' else 'month')
+
+    @staticmethod
+    def _agrupar(tabela, by, medidas):
+        agregacoes = [([], "count_all")]
+        for col in medidas:
+            agregacoes += [(col, "sum"), (col, "count")]
+        resultado = tabela.group_by(by).aggregate(agregacoes).to_pandas()
+
+        resultado = resultado.rename(columns={"count_all": COL_FOCOS})
+        for col in medidas:
+            resultado = resultado.rename(columns={f"{col}_sum": f"{col}_soma", f"{col}_count": f"{col}_n"})
+        # Como no pandas: chaves nulas ficam de fora e o resultado sai ordenado
+        resultado = resultado[resultado[by].notna()]
+        if by == 'Mes_Nome':
+            resultado[by] = resultado[by].astype(TIPO_MES)
+        ordem = [COL_FOCOS] + [f"{col}_{s}" for col in medidas for s in ("soma", "n")]
+        return resultado.sort_values(by).reset_index(drop=True)[[by] + ordem]
+
+    def grid(self, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+        """Grade do mapa calculada nos arquivos: [ix, iy, FRP, n_focos]"""
+        nomes = self.dataset.schema.names
+        if 'Latitude' not in nomes or 'Longitude' not in nomes:
+            return None
+        lat = ds.field('Latitude').cast(pa.float64())
+        lon = ds.field('Longitude').cast(pa.float64())
+        frp = pc.coalesce(ds.field('FRP').cast(pa.float64()), pa.scalar(1.0)) if 'FRP' in nomes else pa.scalar(1.0)
+        colunas = {
+            'ix': pc.floor(pc.divide(lon, GRADE_BASE)).cast(pa.int32()),
+            'iy': pc.floor(pc.divide(lat, GRADE_BASE)).cast(pa.int32()),
+            'FRP': frp,
+        }
+        filtro = ds.field('Latitude').is_valid() & ds.field('Longitude').is_valid()
+        filtro_local = self._filtro(estado_sel, cidade_sel, periodo, regiao)
+        if filtro_local is not None:
+            filtro = filtro & filtro_local
+
+        resultado = self._grade(self._ler(self.dataset, colunas, filtro, regiao))
+        if self.repetidas is not None:
+            repetidas = self._grade(self._ler(self.repetidas, colunas, filtro, regiao))
+            resultado = _descontar(resultado, repetidas, ['ix', 'iy'])
+        return resultado
+
+    @staticmethod
+    def _grade(tabela):
+        resultado = tabela.group_by(['ix', 'iy']).aggregate([('FRP', 'sum'), ([], 'count_all')]).to_pandas()
+        return resultado.rename(columns={'FRP_sum': 'FRP', 'count_all': COL_FOCOS})
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_backend(nome, versao, _dados, fontes=()):
+    """Cria o backend pelo nome, uma vez por versão dos dados (_dados não é hasheado).
+    O Arrow precisa dos arquivos Parquet de todos os anos carregados, em
+    fontes = ((ano, arquivo), ...) (data_loader.columnar_sources, vazio quando
+    algum arquivo está desatualizado); sem eles, volta para o pandas."""
+    if nome == "arrow" and fontes and all(os.path.exists(a) for _, a in fontes):
+        return ArrowBackend(list(fontes), list(_dados['df'].columns))
+    return PandasBackend(_dados)
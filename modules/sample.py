@@ -0,0 +1,160 @@
+# modules/sample.py
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.cube import COL_FOCOS, MEDIDAS_CUBO
+from modules.schema import concat_frames
+from modules.spatial import build_grid, region_mask
+from modules.temporal import add_periods, period_bounds
+
+""" Modo aproximado: gráficos estimados a partir de uma amostra estratificada
+(ano x mês x estado), mostrados enquanto os agregados exatos são calculados.
+Cada linha da amostra tem um peso (tamanho do estrato / linhas sorteadas);
+as tabelas estimadas têm o formato do cubo (modules/cube.py), com somas
+ponderadas, e mais as somas usadas no intervalo de confiança das médias.
+A amostra de cada ano é sorteada na carga do arquivo (modules/data_loader.py):
+na hora de mostrar as estimativas só as amostras dos anos são juntadas."""
+
+# Fração sorteada de cada estrato e mínimo de linhas por estrato
+FRACAO_AMOSTRA = float(os.environ.get("DATABURN_SAMPLE_FRACTION", "0.02"))
+MINIMO_ESTRATO = 30
+# Abaixo deste número de linhas o cálculo exato é rápido: sem modo aproximado
+LIMIAR_APROXIMADO = int(os.environ.get("DATABURN_APPROX_MIN_ROWS", "1000000"))
+
+ESTRATOS = ['Ano', 'Mes_Num', 'Estado']
+COLUNAS_AMOSTRA = ['DataHora', 'Ano', 'Mes_Num', 'Mes_Nome', 'Estado', 'Municipio', 'Bioma',
+                   'RiscoFogo', 'Precipitacao', 'FRP', 'Latitude', 'Longitude']
+
+# z da normal para o intervalo de 95%
+Z_95 = 1.96
+
+
+def _codigos_estrato(df):
+    """Código inteiro do estrato de cada linha (raiz mista dos códigos das colunas)."""
+    codigos = np.zeros(len(df), dtype=np.int64)
+    for col in [c for c in ESTRATOS if c in df.columns]:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores, tamanho = serie.cat.codes.to_numpy().astype(np.int64) + 1, len(serie.cat.categories) + 1
+        else:
+            valores, uniques = pd.factorize(serie)
+            valores, tamanho = valores.astype(np.int64) + 1, len(uniques) + 1
+        codigos = codigos * tamanho + valores
+    return pd.factorize(codigos)[0]
+
+
+def build_sample(df, fracao=FRACAO_AMOSTRA, minimo=MINIMO_ESTRATO, seed=0):
+    """Amostra estratificada por ano, mês e estado, em uma passada (sem ordenar).
+    Cada estrato é sorteado com a fração pedida, ou com o suficiente para ter
+    ao menos `minimo` linhas. A coluna 'peso' expande a amostra para o total."""
+    estrato = _codigos_estrato(df)
+    total = np.bincount(estrato)
+    taxa = np.clip(np.maximum(fracao, minimo / total), 0.0, 1.0)
+
+    rng = np.random.default_rng(seed)
+    sorteadas = rng.random(len(df)) < taxa[estrato]
+    tamanho = np.bincount(estrato[sorteadas], minlength=len(total))
+    peso = total / np.maximum(tamanho, 1)
+
+    colunas = [c for c in COLUNAS_AMOSTRA if c in df.columns]
+    amostra = df.loc[sorteadas, colunas].reset_index(drop=True)
+    amostra['peso'] = peso[estrato[sorteadas]]
+    return amostra
+
+
+@st.cache_resource(show_spinner=False, ttl=3600, max_entries=32)
+def year_sample(ano, assinatura, _df):
+    """Amostra de um ano, uma vez por versão do arquivo (assinatura do CSV).
+    Chamada pelo loader logo depois da leitura do ano, na mesma thread."""
+    return build_sample(_df)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def prepare_sample(versao, _amostras):
+    """Amostra do conjunto carregado: junta as amostras dos anos (year_sample),
+    sem passar pelas linhas do conjunto. Repetidas entre anos, que o conjunto
+    exato descarta, podem entrar na amostra de cada ano (efeito desprezível)."""
+    if not _amostras:
+        return pd.DataFrame(columns=COLUNAS_AMOSTRA + ['peso'])
+    return concat_frames(_amostras)
+
+
+def use_approximate(n_linhas, exato_pronto):
+    """Mostra estimativas antes dos resultados exatos? Só em conjuntos grandes,
+    quando os exatos ainda não estão prontos e o modo exato não foi forçado."""
+    return (not st.session_state.get("modo_exato", False)
+            and not exato_pronto and n_linhas >= LIMIAR_APROXIMADO)
+
+
+def _filtrar(amostra, estado_sel, cidade_sel, periodo=None, regiao=None):
+    if estado_sel != "Todos":
+        amostra = amostra[amostra['Estado'] == estado_sel]
+    if cidade_sel != "Todas":
+        amostra = amostra[amostra['Municipio'] == cidade_sel]
+    if periodo is not None and 'DataHora' in amostra.columns:
+        inicio, fim = period_bounds(periodo)
+        amostra = amostra[(amostra['DataHora'] >= inicio) & (amostra['DataHora'] < fim)]
+    if regiao is not None and 'Latitude' in amostra.columns:
+        amostra = amostra[region_mask(amostra['Latitude'], amostra['Longitude'], regiao)]
+    return amostra
+
+
+def estimate_plan(amostra, dims, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+    """Tabelas estimadas de cada dimensão, no formato do cubo:
+    n_focos e <col>_soma/<col>_n são somas ponderadas pelo peso; <col>_q,
+    <col>_qy e <col>_qyy (somas de peso², peso²·y e peso²·y²) dão o erro padrão.
+    Dimensões de período (Dia, Semana, Mes) são derivadas de DataHora."""
+    amostra = _filtrar(amostra, estado_sel, cidade_sel, periodo, regiao)
+    if 'DataHora' in amostra.columns:
+        amostra = add_periods(amostra, dims, 'DataHora')
+    peso = amostra['peso'].to_numpy()
+    base = amostra[list(dict.fromkeys(dims))].copy(deep=False)
+    base[COL_FOCOS] = peso
+    for col in [c for c in MEDIDAS_CUBO if c in amostra.columns]:
+        valores = amostra[col].to_numpy(np.float64, na_value=np.nan)
+        validos = ~np.isnan(valores)
+        y = np.where(validos, valores, 0.0)
+        base[f'{col}_soma'] = peso * y
+        base[f'{col}_n'] = peso * validos
+        base[f'{col}_q'] = peso ** 2 * validos
+        base[f'{col}_qy'] = peso ** 2 * y
+        base[f'{col}_qyy'] = peso ** 2 * y ** 2
+
+    tabelas = {}
+    for dim in dict.fromkeys(dims):
+        colunas = [c for c in base.columns if c not in dims]
+        tabela = base.groupby(dim, observed=True)[colunas].sum().reset_index()
+        tabela[COL_FOCOS] = tabela[COL_FOCOS].round().astype(np.int64)
+        tabelas[dim] = tabela
+    return tabelas
+
+
+def estimate_grid(amostra, estado_sel="Todos", cidade_sel="Todas", periodo=None, regiao=None):
+    """Grade estimada do mapa de calor: FRP de cada linha multiplicado pelo peso."""
+    amostra = _filtrar(amostra, estado_sel, cidade_sel, periodo, regiao)
+    if 'Latitude' not in amostra.columns:
+        return None
+    frp = amostra['FRP'].fillna(1) if 'FRP' in amostra.columns else 1.0
+    return build_grid(amostra.assign(FRP=frp * amostra['peso']))
+
+
+def is_estimate(df):
+    return any(c.endswith('_qyy') for c in df.columns)
+
+
+def mean_interval(df, by, col, z=Z_95):
+    """Média estimada de col por by e a meia largura do intervalo de confiança.
+    Erro padrão por linearização do estimador de razão (média ponderada):
+    EP² = Σ w²(y - m)² / (Σ w)², com as somas já acumuladas na tabela.
+    Retorna [by, col, <col>_ic]."""
+    somas = df.groupby(by, observed=True)[
+        [f'{col}_soma', f'{col}_n', f'{col}_q', f'{col}_qy', f'{col}_qyy']
+    ].sum()
+    n = somas[f'{col}_n'].replace(0, np.nan)
+    media = somas[f'{col}_soma'] / n
+    desvios = somas[f'{col}_qyy'] - 2 * media * somas[f'{col}_qy'] + media ** 2 * somas[f'{col}_q']
+    erro = np.sqrt(desvios.clip(lower=0)) / n
+    return pd.DataFrame({col: media, f'{col}_ic': z * erro}).reset_index()
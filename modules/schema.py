@@ -0,0 +1,84 @@
+# modules/schema.py
+import pandas as pd
+import numpy as np
+
+""" Schema declarado dos dados DataBurn, aplicado uma única vez na carga"""
+
+# Versão do schema: gravada no cache colunar, invalida caches antigos quando muda
+SCHEMA_VERSION = "2"
+
+# Formato do DataHora nos CSVs (ex.: 2025/10/25 18:13:00)
+FORMATO_DATA = "%Y/%m/%d %H:%M:%S"
+
+# Dimensões de texto -> categóricas (agrupamentos sobre códigos inteiros)
+COLUNAS_CATEGORICAS = ['Estado', 'Municipio', 'Bioma']
+
+# Medidas -> float32
+COLUNAS_MEDIDAS = ['RiscoFogo', 'Precipitacao', 'FRP', 'Latitude', 'Longitude']
+
+# Colunas derivadas de DataHora
+COLUNAS_DERIVADAS = ['Ano', 'Mes_Num', 'Mes_Nome']
+
+MESES = [
+    '01-Jan', '02-Fev', '03-Mar', '04-Abr', '05-Mai', '06-Jun',
+    '07-Jul', '08-Ago', '09-Set', '10-Out', '11-Nov', '12-Dez'
+]
+# 'N/A' é usado quando o arquivo não tem coluna de data
+TIPO_MES = pd.CategoricalDtype(MESES + ['N/A'], ordered=True)
+
+
+def _parse_datas(serie):
+    """Converte DataHora com formato explícito.
+    Se nenhuma data casar com o formato, tenta a inferência do pandas."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    datas = pd.to_datetime(serie, format=FORMATO_DATA, errors='coerce')
+    if datas.isna().all() and serie.notna().any():
+        datas = pd.to_datetime(serie, errors='coerce')
+    return datas
+
+
+def apply_schema(df, year):
+    """Aplica o schema DataBurn ao DataFrame de um ano (altera df e o retorna).
+    Converte tipos e deriva Ano/Mes_Num/Mes_Nome. Sentinelas, faixas e
+    duplicatas ficam para a validação (modules/validation.py)."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in COLUNAS_MEDIDAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+
+    if 'DataHora' in df.columns:
+        df['DataHora'] = _parse_datas(df['DataHora'])
+        datas = df['DataHora']
+        # Datas inválidas ficam no ano do arquivo e com mês 0
+        df['Ano'] = datas.dt.year.fillna(year).astype(np.int16)
+        df['Mes_Num'] = datas.dt.month.fillna(0).astype(np.int8)
+        df['Mes_Nome'] = pd.Categorical.from_codes(
+            df['Mes_Num'].to_numpy().astype(np.int64) - 1, dtype=TIPO_MES
+        )
+    else:
+        df['Ano'] = np.int16(year)
+        df['Mes_Num'] = np.int8(0) # Valor numérico para evitar erros de tipo
+        df['Mes_Nome'] = pd.Categorical(['N/A'] * len(df), dtype=TIPO_MES)
+
+    return df
+
+
+def concat_frames(frames):
+    """Concatena frames de anos diferentes mantendo as colunas categóricas.
+    As categorias de cada ano são unificadas (e ordenadas) antes do concat,
+    senão o pandas converteria as colunas de volta para object."""
+    frames = [f.copy(deep=False) for f in frames]
+    for col in COLUNAS_CATEGORICAS:
+        if not all(col in f.columns for f in frames):
+            continue
+        categorias = frames[0][col].cat.categories
+        for f in frames[1:]:
+            categorias = categorias.union(f[col].cat.categories)
+        for f in frames:
+            if not f[col].cat.categories.equals(categorias):
+                f[col] = f[col].cat.set_categories(categorias)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,87 @@
+# modules/shared_store.py
+import glob
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+from modules.schema import TIPO_MES
+
+""" Armazenamento compartilhado dos dados carregados, em arquivos Arrow IPC
+mapeados em memória (somente leitura).
+Todas as sessões e todos os processos (workers) que abrem a mesma versão leem
+as mesmas páginas do arquivo, sem cópia: a memória residente não cresce com o
+número de usuários. Cada versão é um arquivo próprio; uma versão nova é gravada
+ao lado e as antigas são apagadas (quem ainda as mapeia continua lendo)."""
+
+# DATABURN_SHARED_STORE=1 ativa o armazenamento compartilhado
+SHARED_STORE = os.environ.get("DATABURN_SHARED_STORE", "0") == "1"
+STORE_DIR = os.environ.get("DATABURN_STORE_DIR", "data/.store")
+
+_LOCK = threading.Lock()
+
+
+def _caminho(nome, versao):
+    return os.path.join(STORE_DIR, f"{nome}.{versao}.arrow")
+
+
+def _coluna_arrow(serie):
+    """Floats são gravados com NaN no próprio valor (sem máscara de nulos):
+    assim a leitura vira um array NumPy apontando direto para o arquivo."""
+    if pd.api.types.is_float_dtype(serie.dtype):
+        return pa.array(serie.to_numpy(), from_pandas=False)
+    return pa.Array.from_pandas(serie)
+
+
+def _gravar(df, caminho):
+    """Grava o DataFrame em Arrow IPC sem compressão (requisito do mapeamento).
+    Arquivo temporário + rename: quem abre nunca vê um arquivo pela metade."""
+    tabela = pa.table({col: _coluna_arrow(df[col]) for col in df.columns})
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    os.replace(tmp, caminho)
+
+
+def _mapear(caminho):
+    """DataFrame sobre o arquivo mapeado. Colunas numéricas sem nulos são
+    visões do mapeamento (zero cópia, somente leitura)."""
+    with pa.memory_map(caminho, 'r') as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    df = tabela.to_pandas(split_blocks=True, self_destruct=False)
+    if 'Mes_Nome' in df.columns:
+        # O IPC guarda só o dicionário usado: restaura as categorias e a ordem
+        df['Mes_Nome'] = df['Mes_Nome'].astype(TIPO_MES)
+    return df
+
+
+def _remover_antigas(nome, versao):
+    atual = _caminho(nome, versao)
+    for caminho in glob.glob(_caminho(nome, '*')):
+        if caminho != atual and not caminho.endswith('.tmp'):
+            try:
+                os.remove(caminho) # Mapeamentos abertos continuam válidos (POSIX)
+            except OSError:
+                pass
+
+
+def shared_frame(nome, versao, construir):
+    """Retorna (DataFrame mapeado, criado). Se a versão ainda não está no
+    armazenamento, chama construir(), grava o resultado e apaga as versões
+    antigas do mesmo nome. O DataFrame retornado não pode ser alterado."""
+    caminho = _caminho(nome, versao)
+    if os.path.exists(caminho):
+        try:
+            return _mapear(caminho), False
+        except (OSError, pa.ArrowInvalid):
+            pass # Arquivo inválido: reconstrói
+
+    df = construir()
+    with _LOCK:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        _gravar(df, caminho)
+        _remover_antigas(nome, versao)
+    return _mapear(caminho), True
+
@@ -0,0 +1,189 @@
+# modules/spatial.py
+import pandas as pd
+import numpy as np
+
+from modules.cube import COL_FOCOS, merge_partials
+
+""" Agregação espacial em grade (lat/lon) para o mapa de calor.
+Em vez de amostrar pontos, as detecções são somadas por célula."""
+
+# Tamanho da célula da grade base, em graus (~5,5 km no equador)
+GRADE_BASE = 0.05
+
+# Dimensões mantidas na grade pré-calculada, para que os filtros só re-somem células
+DIMENSOES_GRADE = ['Estado', 'Municipio']
+
+# Célula do índice espacial, em graus (~28 km): poucas células por consulta
+CELULA_INDICE = 0.25
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU = RAIO_TERRA_KM * np.pi / 180
+
+
+def build_grid(df, lat_col='Latitude', lon_col='Longitude', dims=DIMENSOES_GRADE):
+    """Soma FRP e conta detecções por célula da grade base (e por dims).
+    Linhas sem coordenada ficam de fora; FRP ausente pesa 1, como no mapa original."""
+    dims = [c for c in dims if c in df.columns]
+    lat = df[lat_col].to_numpy(dtype=np.float64)
+    lon = df[lon_col].to_numpy(dtype=np.float64)
+    validos = np.isfinite(lat) & np.isfinite(lon)
+
+    if 'FRP' in df.columns:
+        peso = df['FRP'].fillna(1).to_numpy(dtype=np.float64)
+    else:
+        peso = np.ones(len(df))
+
+    base = df[dims][validos].reset_index(drop=True)
+    base['ix'] = np.floor(lon[validos] / GRADE_BASE).astype(np.int32)
+    base['iy'] = np.floor(lat[validos] / GRADE_BASE).astype(np.int32)
+    base['FRP'] = peso[validos]
+    base[COL_FOCOS] = np.int64(1)
+
+    grade = base.groupby(dims + ['ix', 'iy'], observed=True, dropna=False, sort=False).sum()
+    return grade.reset_index()
+
+
+def merge_grids(a, b):
+    """Grade de a + b, para acrescentar linhas novas sem reagregar tudo."""
+    return merge_partials(a, b, DIMENSOES_GRADE + ['ix', 'iy'])
+
+
+def is_grid(df):
+    return 'ix' in df.columns and 'iy' in df.columns
+
+
+def cell_size_for_zoom(zoom, pixels=4):
+    """Tamanho de célula (graus) equivalente a alguns pixels no nível de zoom.
+    Um tile de 256 px cobre 360 graus no zoom 0 e metade a cada nível."""
+    return 360.0 / (256 * 2 ** zoom) * pixels
+
+
+def heatmap_cells(df, lat_col, lon_col, zoom):
+    """Células do mapa de calor para o nível de zoom.
+    df pode ser a grade pré-calculada (build_grid) ou as detecções.
+    Retorna [lon_col, lat_col, FRP, n_focos] com o centro de cada célula,
+    cobrindo 100% das detecções."""
+    fina = df if is_grid(df) else build_grid(df, lat_col, lon_col, dims=[])
+
+    # A célula final é um múltiplo inteiro da grade base
+    fator = max(1, int(round(cell_size_for_zoom(zoom) / GRADE_BASE)))
+    celulas = pd.DataFrame({
+        'gx': fina['ix'].to_numpy() // fator,
+        'gy': fina['iy'].to_numpy() // fator,
+        'FRP': fina['FRP'].to_numpy(),
+        COL_FOCOS: fina[COL_FOCOS].to_numpy(),
+    }).groupby(['gx', 'gy'], sort=False).sum().reset_index()
+
+    tamanho = fator * GRADE_BASE
+    return pd.DataFrame({
+        lon_col: (celulas['gx'] + 0.5) * tamanho,
+        lat_col: (celulas['gy'] + 0.5) * tamanho,
+        'FRP': celulas['FRP'],
+        COL_FOCOS: celulas[COL_FOCOS],
+    })
+
+
+# Recortes de região: ('caixa', sul, norte, oeste, leste) ou ('raio', lat, lon, km)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em km pelo grande círculo (vetorizada)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def region_bbox(regiao):
+    """Retângulo (sul, norte, oeste, leste) que contém a região."""
+    if regiao[0] == 'caixa':
+        return regiao[1:]
+    _, lat, lon, km = regiao
+    dlat = km / KM_POR_GRAU
+    # Círculo que alcança um polo cobre todas as longitudes
+    if abs(lat) + dlat >= 90.0:
+        return max(lat - dlat, -90.0), min(lat + dlat, 90.0), -180.0, 180.0
+    # Meia largura em longitude: o meridiano tangente ao círculo (não dlat / cos(lat),
+    # que fica aquém dele longe do equador)
+    dlon = np.degrees(np.arcsin(min(1.0, np.sin(km / RAIO_TERRA_KM) / np.cos(np.radians(lat)))))
+    # O retângulo não dá a volta no antimeridiano: cruzá-lo vale todas as longitudes
+    if lon - dlon < -180.0 or lon + dlon > 180.0:
+        return lat - dlat, lat + dlat, -180.0, 180.0
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def region_mask(lat, lon, regiao):
+    """Máscara exata (vetorizada) dos pontos dentro da região."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if regiao[0] == 'raio':
+        return haversine_km(lat, lon, regiao[1], regiao[2]) <= regiao[3]
+    _, sul, norte, oeste, leste = regiao
+    return (lat >= sul) & (lat <= norte) & (lon >= oeste) & (lon <= leste)
+
+
+def region_view(regiao, largura_px=700):
+    """Centro (lat, lon) e zoom do mapa que enquadram a região."""
+    sul, norte, oeste, leste = region_bbox(regiao)
+    extensao = max(norte - sul, leste - oeste, 1e-3) * 1.2
+    zoom = int(np.clip(np.floor(np.log2(360.0 * largura_px / 256 / extensao)), 3, 11))
+    return (sul + norte) / 2, (oeste + leste) / 2, zoom
+
+
+def build_spatial_index(df, lat_col='Latitude', lon_col='Longitude', celula=CELULA_INDICE):
+    """Índice em grade das coordenadas, construído uma vez por conjunto de dados.
+    As posições (iloc) ficam ordenadas pela célula (faixa de latitude, depois
+    longitude): as células de uma faixa dentro de um retângulo são um trecho
+    contíguo, achado por busca binária. Retorna None sem coordenadas."""
+    if lat_col not in df.columns or lon_col not in df.columns:
+        return None
+    lat = df[lat_col].to_numpy(dtype=np.float64)
+    lon = df[lon_col].to_numpy(dtype=np.float64)
+    validos = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    if len(validos) == 0:
+        return None
+
+    lat, lon = lat[validos], lon[validos]
+    lat0 = np.floor(lat.min() / celula) * celula
+    lon0 = np.floor(lon.min() / celula) * celula
+    ix = ((lon - lon0) / celula).astype(np.int64)
+    iy = ((lat - lat0) / celula).astype(np.int64)
+    nx = int(ix.max()) + 1
+    chaves = iy * nx + ix
+    ordem = np.argsort(chaves, kind='stable')
+
+    tipo = np.int32 if len(df) < 2 ** 31 else np.int64
+    return {
+        'ordem': validos[ordem].astype(tipo), 'chaves': chaves[ordem],
+        'lat0': lat0, 'lon0': lon0, 'nx': nx, 'ny': int(iy.max()) + 1, 'celula': celula,
+        'limites': (float(lat.min()), float(lat.max()), float(lon.min()), float(lon.max())),
+        'colunas': (lat_col, lon_col),
+    }
+
+
+def _candidatos(indice, sul, norte, oeste, leste):
+    """Posições das linhas nas células que cruzam o retângulo (superconjunto)."""
+    celula = indice['celula']
+    iy0 = int(np.floor((sul - indice['lat0']) / celula))
+    iy1 = int(np.floor((norte - indice['lat0']) / celula))
+    ix0 = int(np.floor((oeste - indice['lon0']) / celula))
+    ix1 = int(np.floor((leste - indice['lon0']) / celula))
+    if iy1 < 0 or ix1 < 0 or iy0 >= indice['ny'] or ix0 >= indice['nx'] or iy0 > iy1 or ix0 > ix1:
+        return indice['ordem'][:0]
+    iy0, iy1 = max(iy0, 0), min(iy1, indice['ny'] - 1)
+    ix0, ix1 = max(ix0, 0), min(ix1, indice['nx'] - 1)
+
+    # Um trecho [inicio, fim) das chaves ordenadas por faixa de latitude
+    faixas = np.arange(iy0, iy1 + 1, dtype=np.int64) * indice['nx']
+    inicio = np.searchsorted(indice['chaves'], faixas + ix0, 'left')
+    fim = np.searchsorted(indice['chaves'], faixas + ix1, 'right')
+    tamanhos = fim - inicio
+    deslocamento = np.repeat(inicio - (np.cumsum(tamanhos) - tamanhos), tamanhos)
+    return indice['ordem'][np.arange(tamanhos.sum()) + deslocamento]
+
+
+def region_positions(indice, df, regiao):
+    """Posições (iloc, crescentes) das linhas dentro da região.
+    Candidatos pelo índice; o teste exato só roda sobre eles."""
+    candidatos = _candidatos(indice, *region_bbox(regiao))
+    lat_col, lon_col = indice['colunas']
+    lat = df[lat_col].to_numpy()[candidatos]
+    lon = df[lon_col].to_numpy()[candidatos]
+    return np.sort(candidatos[region_mask(lat, lon, regiao)])
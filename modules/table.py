@@ -0,0 +1,183 @@
+# modules/table.py
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.perf import instrumented
+
+""" Tabela de dados paginada no servidor.
+Busca e ordenação rodam sobre o DataFrame filtrado, no servidor; o navegador
+recebe só a página atual e a contagem de linhas. A exportação (CSV/Parquet)
+é montada em blocos e só quando pedida; o arquivo inteiro fica em memória
+antes de ser enviado ao navegador."""
+
+TAMANHOS_PAGINA = [25, 50, 100, 500]
+SEM_ORDEM = "(ordem original)"
+BLOCO_EXPORTACAO = 200_000
+
+
+def _chave_ordenacao(serie):
+    """Valores numéricos usados para ordenar a coluna (nulos ficam como NaN).
+    Categorias sem ordem definida são ordenadas pelo texto, não pelo código;
+    as demais colunas (texto) pelo posto de cada valor distinto."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        if serie.cat.ordered:
+            posto = np.arange(len(categorias), dtype=float)
+        else:
+            posto = np.empty(len(categorias), dtype=float)
+            posto[np.argsort(categorias.astype(str))] = np.arange(len(categorias))
+        codigos = serie.cat.codes.to_numpy()
+        valores = posto[codigos]
+        valores[codigos < 0] = np.nan
+        return valores
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        valores = serie.to_numpy().astype('int64').astype(float)
+        valores[serie.isna().to_numpy()] = np.nan
+        return valores
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=float, na_value=np.nan)
+    codigos, _ = pd.factorize(serie, sort=True)
+    valores = codigos.astype(float)
+    valores[codigos < 0] = np.nan
+    return valores
+
+
+def _mascara_busca(serie, texto):
+    """Linhas cuja coluna contém o texto (sem diferenciar maiúsculas).
+    Em colunas categóricas a busca roda só nas categorias."""
+    texto = texto.lower()
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories.astype(str).str.lower()
+        codigos_ok = np.flatnonzero(categorias.str.contains(texto, regex=False))
+        return np.isin(serie.cat.codes.to_numpy(), codigos_ok)
+    return serie.astype(str).str.lower().str.contains(texto, regex=False).to_numpy()
+
+
+@instrumented
+def table_positions(df, col_ordem=None, decrescente=False, col_busca=None, texto_busca=""):
+    """Posições (iloc) das linhas que passam na busca, na ordem pedida.
+    None significa todas as linhas na ordem original (sem cópia)."""
+    posicoes = None
+    if col_busca in df.columns and texto_busca:
+        posicoes = np.flatnonzero(_mascara_busca(df[col_busca], texto_busca))
+
+    if col_ordem in df.columns:
+        serie = df[col_ordem] if posicoes is None else df[col_ordem].iloc[posicoes]
+        valores = _chave_ordenacao(serie)
+        # Nulos sempre no fim, nas duas direções
+        ordem = np.argsort(-valores if decrescente else valores, kind='stable')
+        posicoes = ordem if posicoes is None else posicoes[ordem]
+    return posicoes
+
+
+def table_page(df, posicoes, pagina, tamanho):
+    """Linhas da página (começando em 1) e o total de linhas."""
+    total = len(df) if posicoes is None else len(posicoes)
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total)
+    if posicoes is None:
+        return df.iloc[inicio:fim], total
+    return df.iloc[posicoes[inicio:fim]], total
+
+
+def _fatias(df, posicoes):
+    total = len(df) if posicoes is None else len(posicoes)
+    for inicio in range(0, total, BLOCO_EXPORTACAO):
+        fim = min(inicio + BLOCO_EXPORTACAO, total)
+        yield df.iloc[inicio:fim] if posicoes is None else df.iloc[posicoes[inicio:fim]]
+
+
+def export_csv(df, posicoes):
+    """CSV da fatia atual (bytes), escrito em blocos."""
+    arquivo = io.BytesIO()
+    for i, bloco in enumerate(_fatias(df, posicoes)):
+        arquivo.write(bloco.to_csv(index=False, header=i == 0).encode("utf-8"))
+    return arquivo.getvalue()
+
+
+def export_parquet(df, posicoes):
+    """Parquet da fatia atual (bytes), um row group por bloco."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arquivo = io.BytesIO()
+    escritor = None
+    for bloco in _fatias(df, posicoes):
+        tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(arquivo, tabela.schema)
+        # Dicionários das categorias podem variar entre blocos
+        escritor.write_table(tabela.cast(escritor.schema))
+    if escritor is None:
+        pq.write_table(pa.Table.from_pandas(df.iloc[:0], preserve_index=False), arquivo)
+    else:
+        escritor.close()
+    return arquivo.getvalue()
+
+
+# Formatos da exportação: (função, nome do arquivo, tipo MIME)
+EXPORTACOES = {
+    'CSV': (export_csv, "databurn.csv", "text/csv"),
+    'Parquet': (export_parquet, "databurn.parquet", "application/octet-stream"),
+}
+
+
+def _exportacao(coluna, formato, df, posicoes, chave_posicoes, key):
+    """Botão "Preparar" que monta o arquivo e, depois, o botão de download.
+    O arquivo fica na sessão enquanto a busca/ordenação não mudar."""
+    gerar, nome, mime = EXPORTACOES[formato]
+    chave_estado = f"{key}_exportacao_{formato}"
+    pronto = st.session_state.get(chave_estado)
+    if pronto is not None and pronto[0] != chave_posicoes:
+        del st.session_state[chave_estado]
+        pronto = None
+    if pronto is None:
+        if not coluna.button(f"Preparar {formato}", key=f"{key}_preparar_{formato}"):
+            return
+        with st.spinner(f"Gerando {formato}..."):
+            pronto = (chave_posicoes, gerar(df, posicoes))
+        st.session_state[chave_estado] = pronto
+    coluna.download_button(f"Baixar {formato} ({len(pronto[1]) / 1e6:,.1f} MB)", pronto[1],
+                           file_name=nome, mime=mime, key=f"{key}_baixar_{formato}")
+
+
+def show_paginated_table(df, chave, key="tabela"):
+    """Mostra a tabela paginada. chave identifica o conteúdo de df (versão dos
+    dados + filtros) e decide quando as posições de busca/ordenação em cache
+    na sessão ainda valem."""
+    colunas = list(df.columns)
+    c1, c2, c3, c4 = st.columns([2, 3, 2, 1])
+    col_busca = c1.selectbox("Buscar na coluna:", colunas, key=f"{key}_col_busca")
+    texto_busca = c2.text_input("Contém:", key=f"{key}_busca").strip()
+    col_ordem = c3.selectbox("Ordenar por:", [SEM_ORDEM] + colunas, key=f"{key}_ordem")
+    decrescente = c4.checkbox("Decrescente", key=f"{key}_desc")
+
+    chave_posicoes = (chave, col_busca, texto_busca, col_ordem, decrescente)
+    em_cache = st.session_state.get(f"{key}_posicoes")
+    if em_cache is not None and em_cache[0] == chave_posicoes:
+        posicoes = em_cache[1]
+    else:
+        posicoes = table_positions(
+            df, None if col_ordem == SEM_ORDEM else col_ordem, decrescente, col_busca, texto_busca
+        )
+        st.session_state[f"{key}_posicoes"] = (chave_posicoes, posicoes)
+
+    total = len(df) if posicoes is None else len(posicoes)
+    c5, c6 = st.columns([1, 1])
+    tamanho = c5.selectbox("Linhas por página:", TAMANHOS_PAGINA, key=f"{key}_tamanho")
+    n_paginas = max(1, math.ceil(total / tamanho))
+    pagina = c6.number_input(f"Página (de {n_paginas:,}):", min_value=1, max_value=n_paginas,
+                             value=1, step=1, key=f"{key}_pagina_{n_paginas}")
+
+    pagina_df, total = table_page(df, posicoes, int(pagina), tamanho)
+    st.dataframe(pagina_df, use_container_width=True, hide_index=True)
+    inicio = (int(pagina) - 1) * tamanho
+    st.caption(f"Linhas {min(inicio + 1, total):,}–{inicio + len(pagina_df):,} de {total:,}")
+
+    # Exportação sob demanda: o arquivo só é gerado no clique em "Preparar"
+    for coluna, formato in zip(st.columns(len(EXPORTACOES)), EXPORTACOES):
+        _exportacao(coluna, formato, df, posicoes, chave_posicoes, key)
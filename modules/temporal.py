@@ -0,0 +1,104 @@
+# modules/temporal.py
+import numpy as np
+import pandas as pd
+
+from modules.cube import build_cube, merge_partials
+
+""" Motor temporal: índice das detecções ordenado por DataHora e cubo diário.
+Um intervalo de datas vira uma fatia contígua (busca binária), sem varrer as
+linhas; os gráficos temporais agrupam por dia, semana, mês ou ano a partir
+das agregações parciais por dia."""
+
+# Colunas de período (início do dia, da semana (segunda-feira) ou do mês)
+COLUNAS_PERIODO = ['Dia', 'Semana', 'Mes']
+
+# Cubo diário: Ano e Mes_Nome dependem só do dia (não aumentam o cubo)
+DIMENSOES_DIARIO = ['Dia', 'Ano', 'Mes_Nome', 'Estado', 'Municipio', 'Bioma']
+
+UM_DIA = np.timedelta64(1, 'D')
+
+
+def floor_dates(datas, coluna):
+    """Início do período (Dia, Semana ou Mes) de cada data, em datetime64[ns]."""
+    dias = np.asarray(datas).astype('datetime64[D]')
+    if coluna == 'Semana':
+        # 1970-01-01 foi uma quinta-feira: +3 faz a semana começar na segunda
+        recuo = (dias.astype(np.int64) + 3) % 7
+        dias = dias - recuo.astype('timedelta64[D]')
+    elif coluna == 'Mes':
+        dias = dias.astype('datetime64[M]')
+    return dias.astype('datetime64[ns]')
+
+
+def add_periods(df, dims, col_data):
+    """Acrescenta a df as colunas de período pedidas em dims que ainda não
+    existem, derivadas de col_data. Retorna uma cópia rasa."""
+    faltam = [d for d in dims if d in COLUNAS_PERIODO and d not in df.columns]
+    if not faltam:
+        return df
+    df = df.copy(deep=False)
+    datas = df[col_data].to_numpy(dtype='datetime64[ns]')
+    for dim in faltam:
+        df[dim] = floor_dates(datas, dim)
+    return df
+
+
+def build_time_index(df, col='DataHora'):
+    """Posições (iloc) das linhas ordenadas por data, sem as datas inválidas.
+    Retorna {'ordem': posições, 'datas': datas na mesma ordem}, ou None."""
+    if col not in df.columns:
+        return None
+    datas = df[col].to_numpy(dtype='datetime64[ns]')
+    validas = ~np.isnat(datas)
+    ordem = np.flatnonzero(validas)
+    ordem = ordem[np.argsort(datas[ordem], kind='stable')]
+    tipo = np.int32 if len(df) < 2 ** 31 else np.int64
+    return {'ordem': ordem.astype(tipo), 'datas': datas[ordem]}
+
+
+def date_bounds(tempo):
+    """Primeira e última data (datetime.date) do índice, ou None."""
+    if tempo is None or len(tempo['datas']) == 0:
+        return None
+    return (pd.Timestamp(tempo['datas'][0]).date(), pd.Timestamp(tempo['datas'][-1]).date())
+
+
+def period_bounds(periodo):
+    """(inicio, fim) em datetime64[ns], fim exclusivo: o dia final entra inteiro."""
+    inicio = np.datetime64(periodo[0], 'D').astype('datetime64[ns]')
+    fim = np.datetime64(periodo[1], 'D').astype('datetime64[ns]') + UM_DIA
+    return inicio, fim
+
+
+def _limites(datas, periodo):
+    """Fatia [i, j) de um vetor de datas ordenado para o período."""
+    inicio, fim = period_bounds(periodo)
+    return np.searchsorted(datas, inicio, 'left'), np.searchsorted(datas, fim, 'left')
+
+
+def range_positions(tempo, periodo):
+    """Posições das linhas no período, em ordem crescente (busca binária)."""
+    i, j = _limites(tempo['datas'], periodo)
+    return np.sort(tempo['ordem'][i:j])
+
+
+def build_daily_cube(df):
+    """Agregações parciais por dia (e por local/bioma), ordenadas por Dia."""
+    if 'DataHora' not in df.columns:
+        return None
+    base = add_periods(df, ['Dia'], 'DataHora')
+    diario = build_cube(base, DIMENSOES_DIARIO)
+    diario = diario[diario['Dia'].notna()]
+    return diario.sort_values('Dia', kind='stable').reset_index(drop=True)
+
+
+def merge_daily(a, b):
+    """Cubo diário de a + b (ingestão incremental), de novo ordenado por Dia."""
+    juntos = merge_partials(a, b, DIMENSOES_DIARIO)
+    return juntos.sort_values('Dia', kind='stable').reset_index(drop=True)
+
+
+def slice_daily(diario, periodo):
+    """Linhas do cubo diário no período: fatia contígua por busca binária."""
+    i, j = _limites(diario['Dia'].to_numpy(), periodo)
+    return diario.iloc[i:j]
@@ -1,4 +1,9 @@
 import streamlit as st
+import numpy as np
+
+from modules.perf import instrumented
+from modules.spatial import region_positions
+from modules.temporal import date_bounds, range_positions
 
 def create_sidebar():
     """Cria a sidebar e retorna os anos selecionados"""
@@ -17,30 +22,242 @@ def create_sidebar():
             options=anos_disponiveis, 
             default=[2024]
         )
+
+    # Sem o modo exato, conjuntos grandes mostram estimativas (modules/sample.py)
+    # enquanto os agregados exatos são calculados
+    st.sidebar.toggle(
+        "Forçar resultados exatos", key="modo_exato",
+        help="Não mostra estimativas por amostragem: espera o cálculo exato."
+    )
         
     return anos_selecionados
-def filter_dataframe(df, col_estado, col_cidade):
-    """Aplica os filtros de Estado e Cidade e retorna o DF filtrado"""
+
+def _texto_quarentena(resumo):
+    """Resumo da quarentena de um ano (modules/validation.py) em uma linha, ou None."""
+    if not resumo:
+        return None
+    partes = [f"{col} fora da faixa: {n:,}" for col, n in resumo.get('fora_da_faixa', {}).items()]
+    if resumo.get('duplicadas'):
+        partes.append(f"repetidas: {resumo['duplicadas']:,}")
+    if resumo.get('duplicadas_entre_anos'):
+        partes.append(f"repetidas de outro ano: {resumo['duplicadas_entre_anos']:,}")
+    sentinelas = sum(resumo.get('sentinelas', {}).values())
+    if sentinelas:
+        partes.append(f"sentinelas → vazio: {sentinelas:,}")
+    return " · ".join(partes) or None
+
+def show_load_report(relatorio):
+    """Mostra na sidebar os erros, o tempo de leitura e a quarentena de cada arquivo"""
+    for item in relatorio:
+        if item['erro']:
+            st.sidebar.warning(item['erro'])
+        elif item.get('aviso'):
+            st.sidebar.warning(item['aviso'])
+
+    with st.sidebar.expander("Detalhes do carregamento"):
+        for item in relatorio:
+            if item['erro'] is None:
+                st.caption(
+                    f"{item['ano']}: {item['linhas']:,} linhas em "
+                    f"{item['segundos']:.2f}s ({item['origem']})"
+                )
+                quarentena = _texto_quarentena(item.get('quarentena'))
+                if quarentena:
+                    st.caption(f"↳ {quarentena}")
+
+def build_filter_index(df, col_estado, col_cidade):
+    """Índice dos filtros de localização, construído uma vez por conjunto de dados.
+    Guarda as listas de opções já ordenadas e as posições (iloc) das linhas
+    de cada estado, cidade e par (estado, cidade)."""
+    index = {'estados': [], 'cidades': [], 'cidades_por_estado': {},
+             'pos_estado': {}, 'pos_cidade': {}, 'pos_estado_cidade': {}}
+
+    if col_estado in df.columns:
+        index['pos_estado'] = df.groupby(col_estado, observed=True).indices
+        index['estados'] = sorted(index['pos_estado'])
+
+    if col_cidade in df.columns:
+        index['pos_cidade'] = df.groupby(col_cidade, observed=True).indices
+        index['cidades'] = sorted(index['pos_cidade'])
+
+    if col_estado in df.columns and col_cidade in df.columns:
+        index['pos_estado_cidade'] = df.groupby([col_estado, col_cidade], observed=True).indices
+        for estado, cidade in index['pos_estado_cidade']:
+            index['cidades_por_estado'].setdefault(estado, []).append(cidade)
+        for cidades in index['cidades_por_estado'].values():
+            cidades.sort()
+
+    return index
+
+def date_range_filter(tempo):
+    """Slider do período na sidebar, sobre o índice temporal (modules/temporal.py).
+    Retorna (inicio, fim) em datetime.date, ou None quando o intervalo inteiro
+    está selecionado."""
+    limites = date_bounds(tempo)
+    periodo = None
+    if limites is not None and limites[0] < limites[1]:
+        # Dados novos mudam os limites: seleção inteira acompanha, parcial é recortada
+        atual = st.session_state.get("filtro_datas")
+        if atual is None or tuple(atual) == st.session_state.get("filtro_datas_limites"):
+            atual = limites
+        else:
+            inicio = min(max(atual[0], limites[0]), limites[1])
+            atual = (inicio, max(min(atual[1], limites[1]), inicio))
+        st.session_state["filtro_datas"] = atual
+        st.session_state["filtro_datas_limites"] = limites
+
+        selecao = st.sidebar.slider(
+            "Período:", min_value=limites[0], max_value=limites[1],
+            format="DD/MM/YYYY", key="filtro_datas"
+        )
+        if tuple(selecao) != limites:
+            periodo = tuple(selecao)
+    return periodo
+
+def region_filter(espaco):
+    """Recorte de região na sidebar (retângulo ou raio), sobre o índice espacial
+    (modules/spatial.py). Retorna ('caixa', sul, norte, oeste, leste),
+    ('raio', lat, lon, km) ou None."""
+    regiao = None
+    if espaco is not None:
+        sul, norte, oeste, leste = (round(v, 2) for v in espaco['limites'])
+        tipo = st.sidebar.radio("Recorte:", ["Todo o mapa", "Retângulo", "Raio"], horizontal=True, key="tipo_regiao")
+        col_a, col_b = st.sidebar.columns(2)
+        if tipo == "Retângulo":
+            caixa = (
+                col_a.number_input("Sul (lat):", -90.0, 90.0, sul, key="regiao_sul"),
+                col_b.number_input("Norte (lat):", -90.0, 90.0, norte, key="regiao_norte"),
+                col_a.number_input("Oeste (lon):", -180.0, 180.0, oeste, key="regiao_oeste"),
+                col_b.number_input("Leste (lon):", -180.0, 180.0, leste, key="regiao_leste"),
+            )
+            regiao = ('caixa',) + caixa
+        elif tipo == "Raio":
+            regiao = (
+                'raio',
+                col_a.number_input("Latitude:", -90.0, 90.0, round((sul + norte) / 2, 2), key="regiao_lat"),
+                col_b.number_input("Longitude:", -180.0, 180.0, round((oeste + leste) / 2, 2), key="regiao_lon"),
+                st.sidebar.number_input("Raio (km):", 1.0, 5000.0, 50.0, step=10.0, key="regiao_km"),
+            )
+    return regiao
+
+# Campos de cada recorte em region_filter, na ordem da tupla
+_CAMPOS_REGIAO = {
+    "Retângulo": ('caixa', ["regiao_sul", "regiao_norte", "regiao_oeste", "regiao_leste"]),
+    "Raio": ('raio', ["regiao_lat", "regiao_lon", "regiao_km"]),
+}
+
+def pending_selection():
+    """Seleção dos filtros antes de os widgets serem desenhados (estimativas do
+    modo aproximado, que saem antes do índice de filtros ficar pronto).
+    Lê os valores dos widgets em st.session_state com as regras deles: trocar
+    o Estado volta a Cidade para "Todas", e o período inteiro vale None. Um
+    recorte cujos campos ainda não foram desenhados fica de fora.
+    Retorna (estado, cidade, periodo, regiao), como filter_dataframe."""
+    estado = st.session_state.get("filtro_estado", "Todos")
+    aplicada = st.session_state.get("selecao_filtros")
+    cidade = "Todas"
+    if aplicada is not None and aplicada[0] == estado:
+        cidade = st.session_state.get("filtro_cidade", "Todas")
+
+    periodo = None
+    datas = st.session_state.get("filtro_datas")
+    if datas is not None and tuple(datas) != st.session_state.get("filtro_datas_limites"):
+        periodo = tuple(datas)
+
+    regiao = None
+    campos = _CAMPOS_REGIAO.get(st.session_state.get("tipo_regiao"))
+    if campos is not None:
+        valores = [st.session_state.get(chave) for chave in campos[1]]
+        if None not in valores:
+            regiao = (campos[0],) + tuple(valores)
+    return estado, cidade, periodo, regiao
+
+@instrumented
+def filter_dataframe(df, col_estado, col_cidade, agregados=None, index=None, tempo=None, espaco=None):
+    """Aplica os filtros de Estado, Cidade e, com os índices temporal e espacial,
+    de período e de região.
+    agregados é um dicionário de tabelas agregadas com as mesmas colunas de
+    Estado/Cidade (cubo, grade do mapa), filtradas junto com as detecções.
+    Retorna (df_filtrado, agregados_filtrados, selecao), com selecao =
+    (estado, cidade, periodo, regiao) — a mesma que foi aplicada. Com o índice
+    (modules/dataset.py), as opções vêm prontas e a seleção é feita por posição,
+    sem cópia nem varredura do DataFrame inteiro; sem índice, ele é construído na hora."""
     st.sidebar.markdown("---")
     st.sidebar.header("Localização")
     
-    df_filtered = df.copy()
-    colunas_presentes = df.columns.tolist()
+    if index is None:
+        index = build_filter_index(df, col_estado, col_cidade)
+    estado_sel, cidade_sel = "Todos", "Todas"
 
     # Filtro de Estado
-    if col_estado in colunas_presentes:
-        lista_estados = sorted(df[col_estado].dropna().unique())
-        estado_sel = st.sidebar.selectbox("Filtrar Estado:", ["Todos"] + lista_estados)
-        
-        if estado_sel != "Todos":
-            df_filtered = df_filtered[df_filtered[col_estado] == estado_sel]
+    if col_estado in df.columns:
+        estado_sel = st.sidebar.selectbox("Filtrar Estado:", ["Todos"] + index['estados'], key="filtro_estado")
     
     # Filtro de Cidade
-    if col_cidade in colunas_presentes:
-        lista_cidades = sorted(df_filtered[col_cidade].dropna().unique())
-        cidade_sel = st.sidebar.selectbox("Filtrar Cidade:", ["Todas"] + lista_cidades)
-        
-        if cidade_sel != "Todas":
-            df_filtered = df_filtered[df_filtered[col_cidade] == cidade_sel]
+    if col_cidade in df.columns:
+        if estado_sel != "Todos":
+            lista_cidades = index['cidades_por_estado'].get(estado_sel, [])
+        else:
+            lista_cidades = index['cidades']
+        cidade_sel = st.sidebar.selectbox("Filtrar Cidade:", ["Todas"] + lista_cidades, key="filtro_cidade")
+
+    # Filtro de Período: fatia do índice ordenado por DataHora
+    periodo = None
+    if tempo is not None:
+        st.sidebar.header("Período")
+        periodo = date_range_filter(tempo)
+
+    # Filtro de Região: candidatos pelo índice espacial, teste exato só neles
+    regiao = None
+    if espaco is not None:
+        st.sidebar.header("Região do mapa")
+        regiao = region_filter(espaco)
+
+    selecao = (estado_sel, cidade_sel, periodo, regiao)
+    # Referência de pending_selection no próximo rerun
+    st.session_state["selecao_filtros"] = selecao
+    df_filtered, agregados_filtrados = apply_location_filter(
+        df, index, col_estado, col_cidade, estado_sel, cidade_sel, agregados,
+        periodo=periodo, tempo=tempo, regiao=regiao, espaco=espaco
+    )
+    return df_filtered, agregados_filtrados, selecao
+
+def location_positions(index, estado_sel, cidade_sel):
+    """Posições (iloc, crescentes) das linhas da seleção, ou None sem filtro."""
+    if estado_sel == "Todos" and cidade_sel == "Todas":
+        return None
+    if cidade_sel == "Todas":
+        return index['pos_estado'][estado_sel]
+    if estado_sel == "Todos":
+        return index['pos_cidade'][cidade_sel]
+    return index['pos_estado_cidade'][(estado_sel, cidade_sel)]
+
+def apply_location_filter(df, index, col_estado, col_cidade, estado_sel, cidade_sel, agregados=None,
+                          periodo=None, tempo=None, regiao=None, espaco=None):
+    """Parte de filter_dataframe sem widgets: aplica uma seleção já feita.
+    periodo (inicio, fim) usa o índice temporal (modules/temporal.py) e regiao
+    o índice espacial (modules/spatial.py); as tabelas agregadas são filtradas
+    só por Estado/Cidade.
+    Retorna (df_filtrado, agregados_filtrados)."""
+    # Sem filtro: o próprio DataFrame, sem cópia
+    posicoes = location_positions(index, estado_sel, cidade_sel)
+    recortes = []
+    if periodo is not None and tempo is not None:
+        recortes.append(range_positions(tempo, periodo))
+    if regiao is not None and espaco is not None:
+        recortes.append(region_positions(espaco, df, regiao))
+    for recorte in recortes:
+        posicoes = recorte if posicoes is None else np.intersect1d(posicoes, recorte, assume_unique=True)
+
+    df_filtered = df if posicoes is None else df.iloc[posicoes]
+
+    # As tabelas agregadas são pequenas: uma máscara basta
+    agregados_filtrados = {}
+    for nome, tabela in (agregados or {}).items():
+        if tabela is not None and estado_sel != "Todos":
+            tabela = tabela[tabela[col_estado] == estado_sel]
+        if tabela is not None and cidade_sel != "Todas":
+            tabela = tabela[tabela[col_cidade] == cidade_sel]
+        agregados_filtrados[nome] = tabela
             
-    return df_filtered
\ No newline at end of file
+    return df_filtered, agregados_filtrados
\ No newline at end of file
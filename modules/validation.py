@@ -0,0 +1,133 @@
+# modules/validation.py
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.schema import COLUNAS_MEDIDAS
+
+""" Validação das detecções na carga, uma vez por versão de cada arquivo.
+Roda logo depois do schema (modules/schema.py) e antes do cache colunar:
+o Parquet já guarda os dados limpos e nenhum gráfico refaz a limpeza.
+  - sentinelas (-999, -9999) viram NaN em todas as medidas
+  - coordenadas ou FRP fora da faixa válida: a linha vai para a quarentena
+  - detecções repetidas (DataHora, Latitude, Longitude): fica a primeira
+O resumo da quarentena de cada ano é gravado ao lado do CSV."""
+
+# Valores usados como placeholder de dado ausente/inválido, em qualquer medida
+SENTINELAS = (-999.0, -9999.0)
+
+# Faixas válidas (inclusivas); NaN é "ausente", não "fora da faixa"
+FAIXAS = {'Latitude': (-90.0, 90.0), 'Longitude': (-180.0, 180.0), 'FRP': (0.0, np.inf)}
+
+# Uma detecção é identificada pelo instante e pela posição
+CHAVE_DETECCAO = ['DataHora', 'Latitude', 'Longitude']
+
+# Linhas da quarentena copiadas no resumo, para inspeção
+EXEMPLOS_QUARENTENA = 5
+
+
+def _novo_resumo(linhas):
+    return {'linhas_lidas': linhas, 'linhas_validas': linhas, 'quarentena': 0,
+            'sentinelas': {}, 'fora_da_faixa': {}, 'duplicadas': 0, 'exemplos': []}
+
+
+def _repetidas(df, anteriores=None):
+    """Máscara das linhas de df cuja chave já apareceu antes (em df ou em anteriores).
+    Linhas com chave incompleta nunca são consideradas repetidas."""
+    if not all(c in df.columns for c in CHAVE_DETECCAO):
+        return np.zeros(len(df), dtype=bool)
+    chaves = df[CHAVE_DETECCAO]
+    if anteriores is not None and len(anteriores):
+        chaves = pd.concat([anteriores[CHAVE_DETECCAO], chaves], ignore_index=True)
+    repetidas = chaves.duplicated().to_numpy()[-len(df):] if len(df) else np.zeros(0, dtype=bool)
+    return repetidas & df[CHAVE_DETECCAO].notna().all(axis=1).to_numpy()
+
+
+def validate(df, anteriores=None):
+    """Limpa o DataFrame de um ano (já no schema) em passadas vetorizadas.
+    anteriores: linhas já validadas do mesmo arquivo (ingestão incremental),
+    usadas só para achar repetidas. Retorna (df_valido, resumo)."""
+    resumo = _novo_resumo(len(df))
+
+    for col in [c for c in COLUNAS_MEDIDAS if c in df.columns]:
+        sentinela = np.isin(df[col].to_numpy(), SENTINELAS)
+        if sentinela.any():
+            df[col] = df[col].mask(sentinela)
+            resumo['sentinelas'][col] = int(sentinela.sum())
+
+    quarentena = np.zeros(len(df), dtype=bool)
+    for col, (minimo, maximo) in FAIXAS.items():
+        if col in df.columns:
+            valores = df[col].to_numpy(np.float64, na_value=np.nan)
+            fora = (valores < minimo) | (valores > maximo)
+            if fora.any():
+                resumo['fora_da_faixa'][col] = int(fora.sum())
+                quarentena |= fora
+
+    repetidas = _repetidas(df, anteriores) & ~quarentena
+    resumo['duplicadas'] = int(repetidas.sum())
+    quarentena |= repetidas
+
+    if quarentena.any():
+        exemplos = df[quarentena].head(EXEMPLOS_QUARENTENA).astype(str)
+        resumo['exemplos'] = exemplos.to_dict(orient='records')
+        df = df[~quarentena].reset_index(drop=True)
+    resumo['quarentena'] = int(quarentena.sum())
+    resumo['linhas_validas'] = len(df)
+    return df, resumo
+
+
+def merge_summaries(a, b):
+    """Resumo de a + b (linhas acrescentadas na ingestão incremental)."""
+    if a is None:
+        return b
+    juntos = {chave: a.get(chave, 0) + b[chave]
+              for chave in ('linhas_lidas', 'linhas_validas', 'quarentena', 'duplicadas')}
+    for chave in ('sentinelas', 'fora_da_faixa'):
+        contagens = dict(a.get(chave, {}))
+        for col, n in b[chave].items():
+            contagens[col] = contagens.get(col, 0) + n
+        juntos[chave] = contagens
+    juntos['exemplos'] = (a.get('exemplos', []) + b['exemplos'])[:EXEMPLOS_QUARENTENA]
+    return juntos
+
+
+def summary_path(csv_path):
+    """Arquivo do resumo ao lado do CSV: dados_2024.csv -> dados_2024_quarentena.json"""
+    return os.path.splitext(csv_path)[0] + '_quarentena.json'
+
+
+def write_summary(csv_path, year, resumo):
+    """Grava o resumo da quarentena do ano em JSON (erros de escrita são ignorados)."""
+    try:
+        with open(summary_path(csv_path), 'w', encoding='utf-8') as f:
+            json.dump({'ano': year, 'arquivo': csv_path, **resumo}, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+def cross_year_duplicates(df, col_ano='ano_origem'):
+    """Máscara das detecções repetidas entre exportações anuais que se sobrepõem
+    (fica a do primeiro ano). Repetidas têm o mesmo DataHora, logo o mesmo Ano:
+    só os anos que aparecem fora do próprio arquivo precisam ser comparados."""
+    repetidas = np.zeros(len(df), dtype=bool)
+    if col_ano not in df.columns or 'Ano' not in df.columns:
+        return repetidas
+    ano = df['Ano'].to_numpy()
+    fora = ano != df[col_ano].to_numpy()
+    if fora.any():
+        suspeitas = np.flatnonzero(np.isin(ano, np.unique(ano[fora])))
+        repetidas[suspeitas] = _repetidas(df.iloc[suspeitas])
+    return repetidas
+
+
+def drop_cross_year_duplicates(df, col_ano='ano_origem'):
+    """Remove as repetidas entre anos (cross_year_duplicates).
+    Retorna (df, {ano do arquivo: linhas removidas})."""
+    repetidas = cross_year_duplicates(df, col_ano)
+    if not repetidas.any():
+        return df, {}
+    anos, contagens = np.unique(df[col_ano].to_numpy()[repetidas], return_counts=True)
+    return df[~repetidas].reset_index(drop=True), dict(zip(anos.tolist(), contagens.tolist()))
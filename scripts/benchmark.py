@@ -0,0 +1,246 @@
+# benchmark.py
+# Descrição: Mede os caminhos críticos do dashboard (carga, filtros, gráficos)
+#            sobre dados sintéticos e salva os resultados em JSON para comparar commits.
+#
+# Uso:
+#   python benchmark.py --linhas 1000000                        -> gera dados em /tmp e mede
+#   python benchmark.py --dir /tmp/databurn --sem-gerar         -> reaproveita dados já gerados
+#   python benchmark.py --saida atual.json --comparar base.json -> mostra a variação por etapa
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import streamlit as st
+
+from gerar_dados_sinteticos import ANOS_PADRAO, generate_dataset
+from modules import data_loader
+from modules.data_loader import load_years_with_report, dataset_version
+from modules.cube import aggregate_plan
+from modules.dataset import clear_prepared, prepare_dataset
+from modules.query_backend import PandasBackend
+from modules.spatial import region_mask, region_positions
+from modules.temporal import date_bounds
+from modules.validation import validate
+from modules.ui import apply_location_filter
+from modules.graphs import (
+    plot_line_evolution,
+    plot_bar_ranking,
+    plot_seasonal_volume,
+    plot_map_density,
+    plot_biome_distribution
+)
+
+COL_ESTADO = 'Estado'
+COL_CIDADE = 'Municipio'
+
+
+def medir(nome, funcao, repeticoes=3, preparar=None):
+    """Executa funcao repeticoes vezes e registra tempo e pico de memória.
+    preparar() roda antes de cada repetição, fora da medição (ex.: limpar caches)."""
+    tempos = []
+    pico = 0
+    resultado = None
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        gc.collect()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+        pico = max(pico, tracemalloc.get_traced_memory()[1] - base)
+
+    item = {
+        'etapa': nome,
+        'segundos_mediana': statistics.median(tempos),
+        'segundos_min': min(tempos),
+        'repeticoes': repeticoes,
+        'pico_mb': pico / 1e6,
+    }
+    print(f"  {nome:<40} {item['segundos_mediana'] * 1000:10.1f} ms  {item['pico_mb']:8.1f} MB")
+    return item, resultado
+
+
+def limpar_memoria():
+    """Esvazia os caches do Streamlit (anos carregados, dataset preparado)."""
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def limpar_tudo(anos):
+    """Também remove o cache colunar do disco: carga a partir do CSV."""
+    limpar_memoria()
+    for ano in anos:
+        caminho = data_loader.find_year_file(ano)
+        if caminho is not None:
+            cache = os.path.splitext(caminho)[0] + '.parquet'
+            if os.path.exists(cache):
+                os.remove(cache)
+
+
+def pico_rss_mb():
+    """Pico de RSS do processo em MB, ou None onde não há o módulo resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss está em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except Exception:
+        return None
+
+
+def executar(anos, repeticoes):
+    resultados = []
+
+    def registrar(nome, funcao, preparar=None, n=repeticoes):
+        item, resultado = medir(nome, funcao, n, preparar)
+        resultados.append(item)
+        return resultado
+
+    print("\n⏱️ Carga")
+    registrar("carga_fria_csv", lambda: load_years_with_report(anos), preparar=lambda: limpar_tudo(anos))
+    registrar("carga_fria_parquet", lambda: load_years_with_report(anos), preparar=limpar_memoria)
+    df, relatorio = registrar("carga_quente", lambda: load_years_with_report(anos))
+    registrar("carga_serial_parquet", lambda: load_years_with_report(anos, workers=1), preparar=limpar_memoria)
+    versao = dataset_version(relatorio)
+    df, relatorio = load_years_with_report(anos)
+    # Validação (modules/validation.py) de novo sobre os dados já limpos: custo da passada
+    registrar("validacao", lambda: validate(df.copy()))
+
+    print("\n⏱️ Dataset preparado")
+    registrar("preparar_dataset", lambda: prepare_dataset(versao, df, COL_ESTADO, COL_CIDADE),
+              preparar=clear_prepared)
+    dados = prepare_dataset(versao, df, COL_ESTADO, COL_CIDADE)
+
+    # Seleções: tudo, o estado com mais focos e a cidade com mais focos desse estado
+    contagem = dados['df'].groupby([COL_ESTADO, COL_CIDADE], observed=True).size()
+    estado, cidade = contagem.idxmax()
+    selecoes = {'todos': ("Todos", "Todas"), 'estado': (estado, "Todas"), 'cidade': (estado, cidade)}
+    agregados = {'cube': dados['cube'], 'grade': dados['grade']}
+
+    for nome_sel, (estado_sel, cidade_sel) in selecoes.items():
+        print(f"\n⏱️ Seleção '{nome_sel}' ({estado_sel} / {cidade_sel})")
+        df_f, agg = registrar(
+            f"filtro[{nome_sel}]",
+            lambda: apply_location_filter(dados['df'], dados['index'], COL_ESTADO, COL_CIDADE,
+                                          estado_sel, cidade_sel, agregados)
+        )
+        cube = agg['cube']
+        registrar(f"plano_agregacao[{nome_sel}]",
+                  lambda: aggregate_plan(cube, ['Ano', 'Mes_Nome', COL_CIDADE, 'Bioma']))
+        registrar(f"plano_agregacao_linhas[{nome_sel}]",
+                  lambda: aggregate_plan(df_f, ['Ano', 'Mes_Nome', COL_CIDADE, 'Bioma']))
+        registrar(f"linha_ano[{nome_sel}]", lambda: plot_line_evolution(cube, 'Ano', 'RiscoFogo', "t"))
+        registrar(f"linha_mes[{nome_sel}]", lambda: plot_line_evolution(cube, 'Mes_Nome', 'RiscoFogo', "t"))
+        registrar(f"sazonal[{nome_sel}]", lambda: plot_seasonal_volume(cube, 'Mes_Nome', "t"))
+        registrar(f"ranking_risco[{nome_sel}]",
+                  lambda: plot_bar_ranking(cube, COL_CIDADE, 'RiscoFogo', "t", is_percent=True))
+        registrar(f"ranking_chuva[{nome_sel}]", lambda: plot_bar_ranking(cube, COL_CIDADE, 'Precipitacao', "t"))
+        registrar(f"mapa[{nome_sel}]", lambda: plot_map_density(agg['grade'], 'Latitude', 'Longitude'))
+        registrar(f"biomas[{nome_sel}]", lambda: plot_biome_distribution(cube, 'Bioma'))
+        # Referência: os mesmos gráficos direto das detecções
+        registrar(f"ranking_risco_linhas[{nome_sel}]",
+                  lambda: plot_bar_ranking(df_f, COL_CIDADE, 'RiscoFogo', "t", is_percent=True))
+
+    # Período (modules/temporal.py): o terço do meio dos dados, por dia e por semana
+    inicio, fim = date_bounds(dados['tempo'])
+    periodo = (inicio + (fim - inicio) / 3, fim - (fim - inicio) / 3)
+    backend = PandasBackend(dados)
+    print(f"\n⏱️ Período {periodo[0]} a {periodo[1]}")
+    registrar("filtro_periodo", lambda: apply_location_filter(
+        dados['df'], dados['index'], COL_ESTADO, COL_CIDADE, "Todos", "Todas",
+        periodo=periodo, tempo=dados['tempo']))
+    diario = registrar("plano_periodo", lambda: backend.aggregate_many(['Dia', 'Semana', COL_CIDADE], periodo=periodo))
+    registrar("linha_dia_periodo", lambda: plot_line_evolution(diario['Dia'], 'Dia', 'RiscoFogo', "t"))
+    registrar("linha_dia_tudo", lambda: plot_line_evolution(backend.aggregate('Dia'), 'Dia', 'RiscoFogo', "t"))
+
+    # Região (modules/spatial.py): 50 km em volta do centro dos dados, pelo índice e por varredura
+    sul, norte, oeste, leste = dados['espaco']['limites']
+    regiao = ('raio', (sul + norte) / 2, (oeste + leste) / 2, 50.0)
+    print(f"\n⏱️ Região {regiao}")
+    registrar("filtro_raio", lambda: region_positions(dados['espaco'], dados['df'], regiao))
+    registrar("filtro_raio_varredura",
+              lambda: region_mask(dados['df']['Latitude'], dados['df']['Longitude'], regiao).nonzero())
+    registrar("plano_raio", lambda: backend.aggregate_many(['Ano', 'Mes_Nome', COL_CIDADE, 'Bioma'], regiao=regiao))
+
+    return resultados, len(df)
+
+
+def comparar(resultados, caminho_base):
+    """Imprime a variação de tempo de cada etapa em relação a um JSON anterior."""
+    with open(caminho_base, encoding="utf-8") as f:
+        base = {item['etapa']: item for item in json.load(f)['resultados']}
+    print(f"\n📊 Comparação com {caminho_base}")
+    for item in resultados:
+        anterior = base.get(item['etapa'])
+        if anterior is None or anterior['segundos_mediana'] == 0:
+            continue
+        razao = item['segundos_mediana'] / anterior['segundos_mediana']
+        alerta = "  ⚠️" if razao > 1.2 else ""
+        print(f"  {item['etapa']:<40} {razao:6.2f}x{alerta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos do DataBurn")
+    parser.add_argument("--dir", default="/tmp/databurn_bench", help="Diretório dos dados sintéticos")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Linhas por ano (100k a 10M)")
+    parser.add_argument("--anos", type=int, nargs="+", default=ANOS_PADRAO)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-gerar", action="store_true", help="Usa os CSVs já existentes em --dir")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+    # Caminhos relativos à pasta de onde o script foi chamado, não a --dir (ver chdir abaixo)
+    args.dir = os.path.abspath(args.dir)
+    args.saida = args.saida and os.path.abspath(args.saida)
+    args.comparar = args.comparar and os.path.abspath(args.comparar)
+
+    if not args.sem_gerar:
+        if os.path.exists(os.path.join(args.dir, "data")):
+            shutil.rmtree(os.path.join(args.dir, "data"))
+        print(f"🔧 Gerando {args.linhas} linhas por ano em {args.dir}...")
+        generate_dataset(args.dir, args.anos, args.linhas, args.seed)
+
+    # O loader usa caminhos relativos (data/db_{ano}/...)
+    os.chdir(args.dir)
+    tracemalloc.start()
+    resultados, total_linhas = executar(args.anos, args.repeticoes)
+    tracemalloc.stop()
+
+    saida = {
+        'commit': commit_atual(),
+        'data': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'config': {'anos': args.anos, 'linhas_por_ano': args.linhas, 'total_linhas': total_linhas,
+                   'seed': args.seed, 'workers': data_loader.LOAD_WORKERS},
+        'pico_rss_mb': pico_rss_mb(),
+        'resultados': resultados,
+    }
+    caminho_saida = args.saida or os.path.join(args.dir, f"benchmark_{saida['commit'] or 'local'}.json")
+    with open(caminho_saida, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=2, ensure_ascii=False)
+    pico = f" (pico RSS {saida['pico_rss_mb']:.0f} MB)" if saida['pico_rss_mb'] is not None else ""
+    print(f"\n📑 Resultados salvos em {caminho_saida}{pico}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
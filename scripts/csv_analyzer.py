@@ -1,8 +1,19 @@
-
 import pandas as pd
+import numpy as np
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+# Tabela virtual: só as linhas visíveis (mais um pequeno buffer) existem no Treeview
+ROW_BUFFER = 10
+ROW_HEIGHT = 20 # Altura aproximada de uma linha do Treeview, em pixels
+
+# Filtros: espera após a última tecla e tamanho dos blocos processados entre
+# verificações de cancelamento
+FILTER_DEBOUNCE_MS = 250
+FILTER_CHUNK = 200_000
+
 class CSVAnalyzerApp:
     def __init__(self, root):
         self.root = root
@@ -11,6 +22,20 @@ class CSVAnalyzerApp:
         self.dataframe = None
         self.file_path = "sample.csv" # Default to sample.csv
 
+        # Estado da tabela virtual
+        self.view_df = None     # DataFrame exibido (completo ou filtrado)
+        self.first_row = 0      # Posição da primeira linha visível
+        self.visible_rows = 25  # Recalculado quando a janela muda de tamanho
+
+        # Estado dos filtros
+        self.lower_cache = {}          # Coluna -> versão minúscula em texto (uma vez por carga)
+        self.cache_lock = threading.Lock()
+        self.filter_generation = 0     # Cada busca nova invalida as anteriores
+        self.filter_after_id = None    # Agendamento do debounce
+        self.filter_results = queue.Queue()
+        self.last_filters = {}         # Filtros e posições do último resultado aplicado,
+        self.last_positions = None     # base para o refinamento incremental
+
         self.create_widgets()
         self.load_csv(self.file_path)
 
@@ -34,12 +59,18 @@ class CSVAnalyzerApp:
         self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Scrollbars para a tabela
-        vsb = ttk.Scrollbar(self.tree, orient="vertical", command=self.tree.yview)
+        # A vertical controla a posição no DataFrame, não o Treeview (que só tem a janela visível)
+        self.vsb = ttk.Scrollbar(self.tree, orient="vertical", command=self.on_scroll)
         hsb = ttk.Scrollbar(self.tree, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        vsb.pack(side="right", fill="y")
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.vsb.pack(side="right", fill="y")
         hsb.pack(side="bottom", fill="x")
 
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)  # Windows/macOS
+        self.tree.bind("<Button-4>", self.on_mousewheel)  # Linux
+        self.tree.bind("<Button-5>", self.on_mousewheel)
+
     def load_csv_dialog(self):
         file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
         if file_path:
@@ -49,6 +80,10 @@ class CSVAnalyzerApp:
     def load_csv(self, file_path):
         try:
             self.dataframe = pd.read_csv(file_path)
+            self.filter_generation += 1 # Descarta buscas da carga anterior
+            self.lower_cache = {}
+            self.last_filters = {}
+            self.last_positions = None
             self.display_data()
             self.create_filter_widgets()
         except Exception as e:
@@ -78,38 +113,168 @@ class CSVAnalyzerApp:
         filter_frame.grid_columnconfigure("all", weight=1)
 
     def display_data(self, filtered_df=None):
-        # Limpar a tabela existente
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         if filtered_df is None:
             df_to_display = self.dataframe
         else:
             df_to_display = filtered_df
 
-        if df_to_display is not None:
-            # Definir colunas
-            self.tree["columns"] = list(df_to_display.columns)
+        if df_to_display is None:
+            return
+
+        # Definir colunas (só quando mudam, não a cada filtro)
+        colunas = list(df_to_display.columns)
+        if list(self.tree["columns"]) != colunas:
+            self.tree.delete(*self.tree.get_children())
+            self.tree["columns"] = colunas
             self.tree["show"] = "headings"
 
-            for col in df_to_display.columns:
+            for col in colunas:
                 self.tree.heading(col, text=col)
                 self.tree.column(col, width=100, anchor="center")
 
-            # Inserir dados
-            for index, row in df_to_display.iterrows():
-                self.tree.insert("", "end", values=list(row))
+        self.view_df = df_to_display
+        self.first_row = 0
+        self.render_window()
+
+    def render_window(self):
+        """Materializa no Treeview só a fatia visível do DataFrame (mais o buffer).
+        Os itens existentes são reaproveitados: o custo não depende do tamanho do arquivo."""
+        total = len(self.view_df)
+        max_first = max(0, total - self.visible_rows)
+        self.first_row = min(max(0, self.first_row), max_first)
+
+        fim = min(total, self.first_row + self.visible_rows + ROW_BUFFER)
+        linhas = self.view_df.iloc[self.first_row:fim].to_numpy(dtype=object).tolist()
+
+        itens = self.tree.get_children()
+        for item, valores in zip(itens, linhas):
+            self.tree.item(item, values=valores)
+        if len(itens) > len(linhas):
+            self.tree.delete(*itens[len(linhas):])
+        for valores in linhas[len(itens):]:
+            self.tree.insert("", "end", values=valores)
+
+        # Atualiza a scrollbar com a posição relativa no DataFrame
+        if total:
+            self.vsb.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def scroll_rows(self, delta):
+        if self.view_df is None: return
+        self.first_row += delta
+        self.render_window()
+
+    def on_scroll(self, *args):
+        """Comandos da scrollbar: ("moveto", fração) ou ("scroll", n, "units"/"pages")"""
+        if self.view_df is None: return
+        if args[0] == "moveto":
+            self.first_row = int(float(args[1]) * len(self.view_df))
+            self.render_window()
+        elif args[0] == "scroll":
+            passo = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_rows(int(args[1]) * passo)
+
+    def on_mousewheel(self, event):
+        para_cima = event.num == 4 or event.delta > 0
+        self.scroll_rows(-3 if para_cima else 3)
+        return "break" # Impede o Treeview de rolar o próprio buffer
+
+    def on_resize(self, event):
+        visiveis = max(1, event.height // ROW_HEIGHT - 1) # -1: linha do cabeçalho
+        if visiveis != self.visible_rows:
+            self.visible_rows = visiveis
+            if self.view_df is not None:
+                self.render_window()
 
     def apply_filters(self, event=None):
+        """Chamado a cada tecla: só reagenda a busca (debounce)."""
         if self.dataframe is None:  return
 
-        filtered_df = self.dataframe.copy()
-        for col, var in self.filter_vars.items():
-            filter_value = var.get().strip()
-            if filter_value:
-                # Filtro case-insensitive e parcial
-                filtered_df = filtered_df[filtered_df[col].astype(str).str.contains(filter_value, case=False, na=False)]
-        
+        if self.filter_after_id is not None:
+            self.root.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.root.after(FILTER_DEBOUNCE_MS, self.start_filter)
+
+    def start_filter(self):
+        """Dispara a busca em uma thread; buscas anteriores ainda rodando são canceladas."""
+        self.filter_after_id = None
+        filtros = {col: var.get().strip().lower() for col, var in self.filter_vars.items()}
+        filtros = {col: valor for col, valor in filtros.items() if valor}
+
+        self.filter_generation += 1
+        worker = threading.Thread(
+            target=self.filter_worker,
+            args=(self.filter_generation, filtros, dict(self.last_filters), self.last_positions),
+            daemon=True,
+        )
+        worker.start()
+        self.root.after(50, self.poll_filter_results, self.filter_generation)
+
+    def lower_column(self, col):
+        """Versão minúscula em texto da coluna, calculada uma vez por carga.
+        Usa strings Arrow quando disponível (busca vetorizada)."""
+        with self.cache_lock:
+            if col not in self.lower_cache:
+                texto = self.dataframe[col].astype(str).str.lower()
+                try:
+                    texto = texto.astype("string[pyarrow]")
+                except (ImportError, TypeError):
+                    pass
+                self.lower_cache[col] = texto
+            return self.lower_cache[col]
+
+    def filter_worker(self, geracao, filtros, base_filtros, base_posicoes):
+        """Calcula as posições das linhas que passam nos filtros.
+        Se cada filtro novo só acrescentou caracteres ao anterior, parte do
+        resultado anterior e só reavalia as colunas que mudaram."""
+        incremental = (
+            base_posicoes is not None
+            and set(base_filtros) <= set(filtros)
+            and all(base_filtros[col] in filtros[col] for col in base_filtros)
+        )
+        if incremental:
+            posicoes = base_posicoes
+            colunas = [col for col in filtros if filtros[col] != base_filtros.get(col)]
+        else:
+            posicoes = np.arange(len(self.dataframe))
+            colunas = list(filtros)
+
+        for col in colunas:
+            texto = self.lower_column(col)
+            partes = []
+            for inicio in range(0, len(posicoes), FILTER_CHUNK):
+                if geracao != self.filter_generation:
+                    return # Busca obsoleta: o usuário continuou digitando
+                bloco = posicoes[inicio:inicio + FILTER_CHUNK]
+                # Filtro case-insensitive e parcial (texto literal)
+                mascara = texto.iloc[bloco].str.contains(filtros[col], regex=False, na=False)
+                partes.append(bloco[np.asarray(mascara, dtype=bool)])
+            posicoes = np.concatenate(partes) if partes else posicoes[:0]
+
+        if geracao != self.filter_generation:
+            return
+        filtered_df = self.dataframe.iloc[posicoes] if filtros else None
+        self.filter_results.put((geracao, filtros, posicoes if filtros else None, filtered_df))
+
+    def poll_filter_results(self, geracao):
+        """Aplica na thread do Tk o resultado da busca geracao, se ela ainda for a atual.
+        Resultados de buscas obsoletas são descartados."""
+        if geracao != self.filter_generation:
+            return # Uma busca mais nova tem seu próprio polling
+
+        resultado = None
+        while not self.filter_results.empty():
+            item = self.filter_results.get_nowait()
+            if item[0] == geracao:
+                resultado = item
+
+        if resultado is None:
+            self.root.after(50, self.poll_filter_results, geracao)
+            return
+
+        _, filtros, posicoes, filtered_df = resultado
+        self.last_filters = filtros
+        self.last_positions = posicoes
         self.display_data(filtered_df)
 
 if __name__ == "__main__":
@@ -1,8 +1,15 @@
 # analise_queimadas.py
 # Descrição: Análise exploratória de dados sobre queimadas no estado do Maranhão
 # Bibliotecas: pandas, matplotlib, seaborn
+#
+# Uso:
+#   python csv_analyzer2.py                  -> carrega o CSV inteiro em memória
+#   python csv_analyzer2.py --streaming      -> lê em blocos, uma única passada e memória limitada
+#   python csv_analyzer2.py --streaming --chunksize 500000 --csv ../data/queimadas_br.csv
 
+import argparse
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
@@ -17,76 +24,263 @@ CAMINHO_CSV = "../data/queimadas_ma.csv"
 DIR_RESULTADOS = "../results"
 DIR_GRAFICOS = os.path.join(DIR_RESULTADOS, "graphs")
 
+# Modo streaming: linhas por bloco e tamanho da amostra usada nos quantis
+CHUNKSIZE = 200_000
+TAMANHO_AMOSTRA = 100_000
+# Acima deste número de valores distintos, a coluna de texto deixa de ser contada
+LIMITE_CATEGORIAS = 100_000
+
 os.makedirs(DIR_GRAFICOS, exist_ok=True)
 
-print("🔍 Carregando base de dados...")
-df = pd.read_csv(CAMINHO_CSV)
 
-print("\n✅ Base carregada com sucesso!")
-print(f"Linhas: {df.shape[0]}, Colunas: {df.shape[1]}")
+def salvar_grafico(serie, titulo, xlabel, nome_arquivo, color=None):
+    """Gráfico de barras de uma contagem, salvo em DIR_GRAFICOS."""
+    serie.plot(kind="bar", figsize=(10, 5), color=color)
+    plt.title(titulo)
+    plt.xlabel(xlabel)
+    plt.ylabel("Número de ocorrências")
+    plt.tight_layout()
+    plt.savefig(os.path.join(DIR_GRAFICOS, nome_arquivo))
+    plt.close()
 
-# Exibir as primeiras linhas
-print("\n📄 Visualização inicial:")
-print(df.head())
 
-# Informações gerais
-print("\nℹ️ Informações da base:")
-print(df.info())
+def salvar_estatisticas(descricao, nulos, top_municipios=None):
+    """Salva o resumo em results/estatisticas.txt"""
+    with open(os.path.join(DIR_RESULTADOS, "estatisticas.txt"), "w", encoding="utf-8") as f:
+        f.write("Resumo da Análise de Queimadas no Maranhão\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(str(descricao))
+        f.write("\n\nValores nulos por coluna:\n")
+        f.write(str(nulos))
+        if top_municipios is not None:
+            f.write("\n\nTop 10 municípios com mais queimadas:\n")
+            f.write(str(top_municipios))
 
-# Estatísticas descritivas
-print("\n📊 Estatísticas descritivas:")
-print(df.describe(include='all'))
 
-# Verificar valores nulos
-print("\n🚨 Valores nulos por coluna:")
-print(df.isnull().sum())
+def analise_em_memoria(caminho_csv):
+    print("🔍 Carregando base de dados...")
+    df = pd.read_csv(caminho_csv)
 
-# Exemplo de colunas comuns (você pode ajustar conforme o seu CSV)
-# Vamos supor que temos colunas como: "estado", "municipio", "ano", "mes", "numero_queimadas"
-# Caso tenha outro nome, você pode adaptar aqui.
+    print("\n✅ Base carregada com sucesso!")
+    print(f"Linhas: {df.shape[0]}, Colunas: {df.shape[1]}")
 
-if "ano" in df.columns and "municipio" in df.columns:
-    # Queimadas por ano
-    queimadas_por_ano = df.groupby("ano").size()
-    queimadas_por_ano.plot(kind="bar", figsize=(10, 5))
-    plt.title("Número de queimadas por ano - Maranhão")
-    plt.xlabel("Ano")
-    plt.ylabel("Número de ocorrências")
-    plt.tight_layout()
-    plt.savefig(os.path.join(DIR_GRAFICOS, "queimadas_por_ano.png"))
-    plt.close()
+    # Exibir as primeiras linhas
+    print("\n📄 Visualização inicial:")
+    print(df.head())
 
-    # Queimadas por mês (se houver coluna 'mes')
-    if "mes" in df.columns:
-        queimadas_por_mes = df.groupby("mes").size().sort_index()
-        queimadas_por_mes.plot(kind="bar", figsize=(10, 5), color="orange")
-        plt.title("Número de queimadas por mês - Maranhão")
-        plt.xlabel("Mês")
-        plt.ylabel("Número de ocorrências")
-        plt.tight_layout()
-        plt.savefig(os.path.join(DIR_GRAFICOS, "queimadas_por_mes.png"))
-        plt.close()
-
-    # Top 10 municípios
-    top_municipios = df["municipio"].value_counts().head(10)
-    top_municipios.plot(kind="bar", figsize=(10, 5), color="green")
-    plt.title("Top 10 municípios com mais queimadas")
-    plt.xlabel("Município")
-    plt.ylabel("Número de ocorrências")
-    plt.tight_layout()
-    plt.savefig(os.path.join(DIR_GRAFICOS, "top10_municipios.png"))
-    plt.close()
+    # Informações gerais
+    print("\nℹ️ Informações da base:")
+    print(df.info())
+
+    # Estatísticas descritivas
+    descricao = df.describe(include='all')
+    print("\n📊 Estatísticas descritivas:")
+    print(descricao)
+
+    # Verificar valores nulos
+    nulos = df.isnull().sum()
+    print("\n🚨 Valores nulos por coluna:")
+    print(nulos)
+
+    # Exemplo de colunas comuns (você pode ajustar conforme o seu CSV)
+    # Vamos supor que temos colunas como: "estado", "municipio", "ano", "mes", "numero_queimadas"
+    # Caso tenha outro nome, você pode adaptar aqui.
+
+    top_municipios = None
+    if "ano" in df.columns and "municipio" in df.columns:
+        # Queimadas por ano
+        salvar_grafico(df.groupby("ano").size(), "Número de queimadas por ano - Maranhão",
+                       "Ano", "queimadas_por_ano.png")
+
+        # Queimadas por mês (se houver coluna 'mes')
+        if "mes" in df.columns:
+            salvar_grafico(df.groupby("mes").size().sort_index(), "Número de queimadas por mês - Maranhão",
+                           "Mês", "queimadas_por_mes.png", color="orange")
+
+        # Top 10 municípios
+        top_municipios = df["municipio"].value_counts().head(10)
+        salvar_grafico(top_municipios, "Top 10 municípios com mais queimadas",
+                       "Município", "top10_municipios.png", color="green")
+
+    print("\n📂 Gráficos salvos em:", DIR_GRAFICOS)
+
+    # Salvar estatísticas em arquivo
+    salvar_estatisticas(descricao, nulos, top_municipios)
+
+    print("\n📑 Estatísticas salvas com sucesso!")
+
+
+class ResumoNumerico:
+    """Resumo mesclável de uma coluna numérica: contagem, mín, máx, média e
+    variância (Chan et al.) mais uma amostra bottom-k para quantis aproximados.
+    Dois resumos de blocos diferentes podem ser combinados com merge()."""
+
+    def __init__(self, tamanho_amostra=TAMANHO_AMOSTRA, seed=0):
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.media = 0.0
+        self.m2 = 0.0
+        self.tamanho_amostra = tamanho_amostra
+        self.rng = np.random.default_rng(seed)
+        # Bottom-k: guarda os valores com as k menores chaves aleatórias
+        self.chaves = np.empty(0)
+        self.amostra = np.empty(0)
+
+    def update(self, valores):
+        valores = pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return
+        bloco = ResumoNumerico(self.tamanho_amostra)
+        bloco.n = len(valores)
+        bloco.minimo = valores.min()
+        bloco.maximo = valores.max()
+        bloco.media = valores.mean()
+        bloco.m2 = ((valores - bloco.media) ** 2).sum()
+        bloco.chaves = self.rng.random(len(valores))
+        bloco.amostra = valores
+        self.merge(bloco)
+
+    def merge(self, outro):
+        if outro.n == 0:
+            return
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        self.media += delta * outro.n / n
+        self.m2 += outro.m2 + delta ** 2 * self.n * outro.n / n
+        self.n = n
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+
+        chaves = np.concatenate([self.chaves, outro.chaves])
+        amostra = np.concatenate([self.amostra, outro.amostra])
+        if len(chaves) > self.tamanho_amostra:
+            manter = np.argpartition(chaves, self.tamanho_amostra)[:self.tamanho_amostra]
+            chaves, amostra = chaves[manter], amostra[manter]
+        self.chaves, self.amostra = chaves, amostra
+
+    def describe(self):
+        if self.n == 0:
+            return {"count": 0.0}
+        q25, q50, q75 = np.quantile(self.amostra, [0.25, 0.5, 0.75])
+        std = np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+        return {"count": float(self.n), "mean": self.media, "std": std, "min": self.minimo,
+                "25%": q25, "50%": q50, "75%": q75, "max": self.maximo}
+
+
+class ResumoCategorico:
+    """Contagem de valores de uma coluna de texto (count/unique/top/freq).
+    Se a coluna passar de LIMITE_CATEGORIAS valores distintos, só a contagem continua."""
+
+    def __init__(self, limite=LIMITE_CATEGORIAS):
+        self.n = 0
+        self.limite = limite
+        self.contagens = pd.Series(dtype="int64")
+
+    def update(self, valores):
+        valores = valores.dropna()
+        self.n += len(valores)
+        if self.contagens is None:
+            return
+        self.contagens = self.contagens.add(valores.value_counts(), fill_value=0)
+        if len(self.contagens) > self.limite:
+            self.contagens = None
+
+    def describe(self):
+        resumo = {"count": self.n}
+        if self.contagens is not None and len(self.contagens):
+            resumo.update(unique=len(self.contagens), top=self.contagens.idxmax(),
+                          freq=int(self.contagens.max()))
+        return resumo
+
+
+def analise_streaming(caminho_csv, chunksize=CHUNKSIZE):
+    """Mesmo relatório da análise em memória, calculado em uma única passada
+    por blocos de chunksize linhas, com memória limitada."""
+    print(f"🔍 Lendo base de dados em blocos de {chunksize} linhas...")
+
+    linhas = 0
+    colunas = None
+    tipos = None
+    nulos = None
+    resumos = {}
+    por_ano = pd.Series(dtype="int64")
+    por_mes = pd.Series(dtype="int64")
+    por_municipio = pd.Series(dtype="int64")
+
+    for bloco in pd.read_csv(caminho_csv, chunksize=chunksize):
+        if colunas is None:
+            colunas = list(bloco.columns)
+            tipos = bloco.dtypes
+            nulos = pd.Series(0, index=colunas, dtype="int64")
+            for col in colunas:
+                numerica = pd.api.types.is_numeric_dtype(bloco[col]) and not pd.api.types.is_bool_dtype(bloco[col])
+                resumos[col] = ResumoNumerico() if numerica else ResumoCategorico()
+
+            print("\n📄 Visualização inicial:")
+            print(bloco.head())
+
+        linhas += len(bloco)
+        nulos += bloco.isnull().sum()
+        for col, resumo in resumos.items():
+            resumo.update(bloco[col])
+
+        if "ano" in bloco.columns and "municipio" in bloco.columns:
+            por_ano = por_ano.add(bloco.groupby("ano").size(), fill_value=0)
+            if "mes" in bloco.columns:
+                por_mes = por_mes.add(bloco.groupby("mes").size(), fill_value=0)
+            por_municipio = por_municipio.add(bloco["municipio"].value_counts(), fill_value=0)
+
+        print(f"   ... {linhas} linhas processadas", end="\r")
+
+    print("\n\n✅ Base processada com sucesso!")
+    print(f"Linhas: {linhas}, Colunas: {len(colunas)}")
+
+    # Informações gerais (equivalente ao df.info())
+    print("\nℹ️ Informações da base:")
+    print(pd.DataFrame({"Não nulos": linhas - nulos, "Tipo (1º bloco)": tipos.astype(str)}))
+
+    # Estatísticas descritivas, no mesmo formato do describe(include='all')
+    linhas_descricao = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+    if all(isinstance(r, ResumoNumerico) for r in resumos.values()):
+        linhas_descricao = [l for l in linhas_descricao if l not in ("unique", "top", "freq")]
+    descricao = pd.DataFrame({col: r.describe() for col, r in resumos.items()}, index=linhas_descricao)
+    print("\n📊 Estatísticas descritivas (quantis aproximados acima de "
+          f"{TAMANHO_AMOSTRA} valores):")
+    print(descricao)
+
+    print("\n🚨 Valores nulos por coluna:")
+    print(nulos)
+
+    top_municipios = None
+    if len(por_ano):
+        salvar_grafico(por_ano.astype("int64"), "Número de queimadas por ano - Maranhão",
+                       "Ano", "queimadas_por_ano.png")
+        if len(por_mes):
+            salvar_grafico(por_mes.astype("int64").sort_index(), "Número de queimadas por mês - Maranhão",
+                           "Mês", "queimadas_por_mes.png", color="orange")
+        top_municipios = por_municipio.astype("int64").sort_values(ascending=False, kind="stable").head(10)
+        top_municipios.name = "count"
+        salvar_grafico(top_municipios, "Top 10 municípios com mais queimadas",
+                       "Município", "top10_municipios.png", color="green")
+
+    print("\n📂 Gráficos salvos em:", DIR_GRAFICOS)
+
+    salvar_estatisticas(descricao, nulos, top_municipios)
+
+    print("\n📑 Estatísticas salvas com sucesso!")
 
-print("\n📂 Gráficos salvos em:", DIR_GRAFICOS)
 
-# Salvar estatísticas em arquivo
-with open(os.path.join(DIR_RESULTADOS, "estatisticas.txt"), "w", encoding="utf-8") as f:
-    f.write("Resumo da Análise de Queimadas no Maranhão\n")
-    f.write("=" * 50 + "\n\n")
-    f.write(str(df.describe(include='all')))
-    f.write("\n\nValores nulos por coluna:\n")
-    f.write(str(df.isnull().sum()))
-    f.write("\n\nTop 10 municípios com mais queimadas:\n")
-    f.write(str(top_municipios))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise exploratória de queimadas")
+    parser.add_argument("--csv", default=CAMINHO_CSV, help="Caminho do CSV")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lê o CSV em blocos (uma passada, memória limitada)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Linhas por bloco no modo streaming")
+    args = parser.parse_args()
 
-print("\n📑 Estatísticas salvas com sucesso!")
+    if args.streaming:
+        analise_streaming(args.csv, args.chunksize)
+    else:
+        analise_em_memoria(args.csv)
@@ -0,0 +1,130 @@
+# gerar_dados_sinteticos.py
+# Descrição: Gera arquivos data/db_{ano}/dados_{ano}.csv sintéticos no schema real do DataBurn,
+#            para benchmarks e testes de carga sem depender dos dados do INPE.
+#
+# Uso:
+#   python gerar_dados_sinteticos.py --dir /tmp/databurn --linhas 1000000
+#   python gerar_dados_sinteticos.py --dir /tmp/databurn --anos 2024 2025 --linhas 100000 --seed 7
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+ANOS_PADRAO = [2020, 2021, 2022, 2023, 2024, 2025]
+
+# Estados com centro aproximado (lat, lon), bioma predominante e peso no total de focos
+ESTADOS = {
+    'MARANHAO':   (-5.0, -45.0, 'Cerrado', 0.30),
+    'PARA':       (-4.5, -52.0, 'Amazônia', 0.30),
+    'TOCANTINS':  (-10.0, -48.3, 'Cerrado', 0.15),
+    'PIAUI':      (-7.5, -42.5, 'Caatinga', 0.10),
+    'MATO GROSSO': (-12.5, -55.5, 'Amazônia', 0.15),
+}
+MUNICIPIOS_POR_ESTADO = 120
+
+# Distribuição sazonal dos focos (pico entre agosto e novembro)
+PESO_MESES = np.array([2, 2, 2, 2, 3, 5, 8, 14, 20, 18, 14, 10], dtype=float)
+
+# Fração de RiscoFogo com o sentinela -999 e de Precipitacao ausente
+FRACAO_SENTINELA = 0.45
+FRACAO_SEM_CHUVA = 0.05
+
+BLOCO_LINHAS = 1_000_000
+
+
+def _municipios(rng):
+    """Cria os municípios de cada estado com um centro geográfico próprio."""
+    nomes, estados, lat, lon, biomas = [], [], [], [], []
+    for estado, (lat_c, lon_c, bioma, _) in ESTADOS.items():
+        for i in range(MUNICIPIOS_POR_ESTADO):
+            nomes.append(f"{estado[:3]}_MUNICIPIO_{i:03d}")
+            estados.append(estado)
+            lat.append(lat_c + rng.normal(0, 1.5))
+            lon.append(lon_c + rng.normal(0, 1.5))
+            # 80% dos municípios no bioma predominante do estado
+            biomas.append(bioma if rng.random() < 0.8 else rng.choice(['Cerrado', 'Amazônia', 'Caatinga']))
+    return pd.DataFrame({'Municipio': nomes, 'Estado': estados, 'lat': lat, 'lon': lon, 'Bioma': biomas})
+
+
+def _bloco(rng, municipios, pesos_mun, ano, n):
+    """Gera n detecções de um ano."""
+    mun = municipios.iloc[rng.choice(len(municipios), size=n, p=pesos_mun)].reset_index(drop=True)
+
+    mes = rng.choice(12, size=n, p=PESO_MESES / PESO_MESES.sum())
+    inicio_mes = np.array([np.datetime64(f"{ano}-{m + 1:02d}-01") for m in range(12)])
+    dias_mes = np.array([28 if m == 1 else 30 for m in range(12)])
+    segundos = (rng.random(n) * dias_mes[mes] * 86400).astype(np.int64)
+    datas = inicio_mes[mes].astype('datetime64[s]') + segundos.astype('timedelta64[s]')
+    # 2025-10-25T18:13:00 -> 2025/10/25 18:13:00
+    data_hora = pd.Series(np.datetime_as_string(datas, unit='s')).str.replace('-', '/').str.replace('T', ' ')
+
+    risco = rng.random(n).round(2)
+    risco[rng.random(n) < FRACAO_SENTINELA] = -999.0
+    precipitacao = (rng.exponential(2.0, n) * (mes < 5)).round(1)
+    precipitacao[rng.random(n) < FRACAO_SEM_CHUVA] = np.nan
+
+    return pd.DataFrame({
+        'DataHora': data_hora,
+        'Satelite': 'AQUA_M-T',
+        'Pais': 'Brasil',
+        'Estado': mun['Estado'],
+        'Municipio': mun['Municipio'],
+        'Bioma': mun['Bioma'],
+        'DiaSemChuva': rng.integers(0, 60, n),
+        'Precipitacao': precipitacao,
+        'RiscoFogo': risco,
+        'FRP': rng.lognormal(3.0, 1.0, n).round(1),
+        'Latitude': (mun['lat'] + rng.normal(0, 0.08, n)).round(5),
+        'Longitude': (mun['lon'] + rng.normal(0, 0.08, n)).round(5),
+    })
+
+
+def generate_dataset(base_dir, anos=ANOS_PADRAO, linhas_por_ano=100_000, seed=42):
+    """Escreve base_dir/data/db_{ano}/dados_{ano}.csv para cada ano.
+    O mesmo seed gera sempre os mesmos arquivos. Retorna a lista de caminhos."""
+    rng = np.random.default_rng(seed)
+    municipios = _municipios(rng)
+    peso_estado = municipios['Estado'].map({e: v[3] for e, v in ESTADOS.items()}).to_numpy()
+    # Poucos municípios concentram muitos focos (distribuição de cauda longa)
+    pesos_mun = peso_estado * rng.pareto(1.5, len(municipios))
+    pesos_mun /= pesos_mun.sum()
+
+    caminhos = []
+    for ano in anos:
+        pasta = os.path.join(base_dir, "data", f"db_{ano}")
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"dados_{ano}.csv")
+        # Escrita em blocos para manter a memória limitada com 10M de linhas
+        for inicio in range(0, linhas_por_ano, BLOCO_LINHAS):
+            n = min(BLOCO_LINHAS, linhas_por_ano - inicio)
+            _bloco(rng, municipios, pesos_mun, ano, n).to_csv(
+                caminho, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False
+            )
+        caminhos.append(caminho)
+    return caminhos
+
+
+def generate_overlap(base_dir, anos, linhas_por_ano=5_000, repetidas=50, seed=42):
+    """Como generate_dataset, mas as primeiras `repetidas` linhas de cada ano
+    também são acrescentadas ao CSV do ano seguinte (exportações anuais que se
+    sobrepõem). Exercita o descarte de repetidas entre anos."""
+    caminhos = generate_dataset(base_dir, anos, linhas_por_ano, seed)
+    for anterior, seguinte in zip(caminhos, caminhos[1:]):
+        with open(anterior, encoding="utf-8") as f:
+            linhas = f.readlines()[1:repetidas + 1]
+        with open(seguinte, "a", encoding="utf-8") as f:
+            f.writelines(linhas)
+    return caminhos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos do DataBurn")
+    parser.add_argument("--dir", default="..", help="Diretório base (recebe a pasta data/)")
+    parser.add_argument("--anos", type=int, nargs="+", default=ANOS_PADRAO)
+    parser.add_argument("--linhas", type=int, default=100_000, help="Linhas por ano")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for caminho in generate_dataset(args.dir, args.anos, args.linhas, args.seed):
+        print(f"✅ {caminho}")
@@ -0,0 +1,237 @@
+# teste_carga.py
+# Descrição: Teste de carga do dashboard: várias sessões simuladas (AppTest, sem navegador)
+#            rodam o app.py em paralelo com roteiros de interação sobre dados sintéticos.
+#            Mede a latência dos reruns (p50/p95/p99), a vazão e a memória por sessão
+#            em cada nível de concorrência.
+#
+# Uso:
+#   python teste_carga.py --linhas 200000                      -> gera dados em /tmp e mede 1, 2, 4, 8 e 16 sessões
+#   python teste_carga.py --dir /tmp/databurn --sem-gerar      -> reaproveita dados já gerados
+#   python teste_carga.py --sessoes 1 10 50 --interacoes 20    -> outros níveis e roteiros mais longos
+#
+# As sessões são threads de um mesmo processo, como no servidor do Streamlit: os caches
+# (st.cache_resource/cache_data) são compartilhados. A memória por sessão é o aumento do
+# RSS do processo com as sessões abertas, dividido pelo número de sessões.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit import config
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+from benchmark import commit_atual, pico_rss_mb
+from gerar_dados_sinteticos import ANOS_PADRAO, generate_dataset
+
+APP = os.path.join(RAIZ, "app.py")
+
+# Avisos do Streamlit repetidos a cada rerun de cada sessão encobririam a tabela
+# (o nível vale depois da leitura da configuração, que o redefiniria)
+config.get_config_options()
+set_log_level("error")
+
+# Peso de cada interação no roteiro (aproxima o uso real: mais filtros que anos)
+INTERACOES = {
+    'anos': 1,
+    'estado': 3,
+    'cidade': 2,
+    'granularidade': 2,
+    'volume': 2,
+    'tabela': 2,
+}
+
+
+def rss_atual_mb():
+    """RSS atual do processo (VmRSS); fora do Linux, o pico (ru_maxrss), e 0
+    onde nem isso existe (Windows)."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return pico_rss_mb() or 0.0
+
+
+def _widget(at, tipo, chave):
+    """Widget pela chave, ou None se ele não está na tela neste rerun."""
+    try:
+        return getattr(at, tipo)(key=chave)
+    except KeyError:
+        return None
+
+
+def _interagir(at, acao, rng, anos):
+    """Aplica uma interação ao estado da sessão (sem rodar). Retorna False se
+    o widget da ação não está na tela (ex.: sem anos selecionados). anos são os
+    anos gerados (--anos), entre os quais a interação de anos escolhe."""
+    if acao == 'anos':
+        todos = at.checkbox[0]
+        if todos.value and rng.random() < 0.7:
+            todos.uncheck()
+        elif not todos.value and len(at.multiselect) and rng.random() < 0.7:
+            escolhidos = rng.sample(anos, rng.randint(1, min(3, len(anos))))
+            at.multiselect[0].set_value(sorted(escolhidos))
+        else:
+            todos.check()
+        return True
+
+    chaves = {
+        'estado': ('selectbox', 'filtro_estado'),
+        'cidade': ('selectbox', 'filtro_cidade'),
+        'granularidade': ('radio', 'tipo_view'),
+        'volume': ('radio', 'tipo_volume'),
+        # A tabela fica no expander "Ver Tabela de Dados Completa"
+        'tabela': ('selectbox', rng.choice(['tabela_ordem', 'tabela_tamanho'])),
+    }
+    widget = _widget(at, *chaves[acao])
+    if widget is None or not widget.options:
+        return False
+    widget.set_value(rng.choice(widget.options))
+    return True
+
+
+def sessao(indice, anos, interacoes, seed, timeout, inicio):
+    """Uma sessão simulada: abre o app e segue um roteiro aleatório (reprodutível).
+    Retorna (AppTest, latências dos reruns em segundos, erros)."""
+    rng = random.Random(seed + indice)
+    acoes, pesos = list(INTERACOES), list(INTERACOES.values())
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    latencias, erros = [], 0
+
+    inicio.wait()
+    for passo in range(interacoes + 1):
+        if passo:
+            acao = rng.choices(acoes, pesos)[0]
+            if not _interagir(at, acao, rng, anos):
+                _interagir(at, 'anos', rng, anos)
+        t0 = time.perf_counter()
+        try:
+            at.run()
+            erros += len(at.exception)
+        except Exception:
+            erros += 1
+        latencias.append(time.perf_counter() - t0)
+    return at, latencias, erros
+
+
+def _percentis(valores):
+    if len(valores) < 2:
+        return {p: (valores[0] if valores else 0.0) for p in ('p50', 'p95', 'p99')}
+    q = statistics.quantiles(valores, n=100, method='inclusive')
+    return {'p50': q[49], 'p95': q[94], 'p99': q[98]}
+
+
+def executar_nivel(n_sessoes, anos, interacoes, seed, timeout):
+    """Roda n_sessoes em paralelo e mede latência, vazão e memória."""
+    gc.collect()
+    rss_base = rss_atual_mb()
+    # Todas as sessões começam juntas, para que os reruns de fato concorram
+    inicio = threading.Barrier(n_sessoes + 1)
+
+    with ThreadPoolExecutor(max_workers=n_sessoes) as pool:
+        futuros = [pool.submit(sessao, i, anos, interacoes, seed, timeout, inicio) for i in range(n_sessoes)]
+        inicio.wait()
+        t0 = time.perf_counter()
+        resultados = [f.result() for f in futuros]
+        duracao = time.perf_counter() - t0
+
+    # Medido com as sessões ainda abertas (o AppTest guarda o estado de cada uma)
+    rss_fim = rss_atual_mb()
+    latencias = [t for _, lat, _ in resultados for t in lat]
+    # O primeiro rerun de cada sessão (abertura da página) também é reportado à parte
+    primeiros = [lat[0] for _, lat, _ in resultados]
+    item = {
+        'sessoes': n_sessoes,
+        'reruns': len(latencias),
+        **{f"{p}_s": v for p, v in _percentis(latencias).items()},
+        'abertura_p50_s': _percentis(primeiros)['p50'],
+        'max_s': max(latencias),
+        'vazao_reruns_s': len(latencias) / duracao,
+        'duracao_s': duracao,
+        'rss_mb': rss_fim,
+        'rss_por_sessao_mb': max(rss_fim - rss_base, 0.0) / n_sessoes,
+        'erros': sum(e for _, _, e in resultados),
+    }
+    del resultados
+    gc.collect()
+    return item
+
+
+def imprimir(item):
+    print(f"  {item['sessoes']:>7} {item['reruns']:>7} {item['p50_s']:>8.3f} {item['p95_s']:>8.3f} "
+          f"{item['p99_s']:>8.3f} {item['vazao_reruns_s']:>9.2f} {item['rss_mb']:>8.0f} "
+          f"{item['rss_por_sessao_mb']:>10.1f} {item['erros']:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas do DataBurn")
+    parser.add_argument("--dir", default="/tmp/databurn_carga", help="Diretório dos dados sintéticos")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Linhas por ano")
+    parser.add_argument("--anos", type=int, nargs="+", default=ANOS_PADRAO)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Níveis de concorrência (sessões simultâneas)")
+    parser.add_argument("--interacoes", type=int, default=10, help="Interações por sessão")
+    parser.add_argument("--timeout", type=float, default=300, help="Limite de cada rerun (s)")
+    parser.add_argument("--sem-gerar", action="store_true", help="Usa os CSVs já existentes em --dir")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    args = parser.parse_args()
+    # Os caminhos valem a partir do diretório de onde o script foi chamado
+    args.dir = os.path.abspath(args.dir)
+    args.saida = args.saida and os.path.abspath(args.saida)
+
+    if not args.sem_gerar:
+        if os.path.exists(os.path.join(args.dir, "data")):
+            shutil.rmtree(os.path.join(args.dir, "data"))
+        print(f"🔧 Gerando {args.linhas} linhas por ano em {args.dir}...")
+        generate_dataset(args.dir, args.anos, args.linhas, args.seed)
+
+    # O loader usa caminhos relativos (data/db_{ano}/...)
+    os.chdir(args.dir)
+
+    # Aquecimento: a primeira sessão carrega os dados e preenche os caches,
+    # custo que não se repete entre os níveis
+    rss_inicial = rss_atual_mb()
+    t0 = time.perf_counter()
+    AppTest.from_file(APP, default_timeout=args.timeout).run()
+    aquecimento = time.perf_counter() - t0
+    print(f"🔥 Aquecimento: {aquecimento:.1f}s, RSS {rss_inicial:.0f} -> {rss_atual_mb():.0f} MB")
+
+    print(f"\n{'sessões':>9} {'reruns':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'reruns/s':>9} "
+          f"{'RSS MB':>8} {'MB/sessão':>10} {'erros':>6}")
+    niveis = []
+    for n in args.sessoes:
+        item = executar_nivel(n, args.anos, args.interacoes, args.seed, args.timeout)
+        imprimir(item)
+        niveis.append(item)
+
+    saida = {
+        'commit': commit_atual(),
+        'data': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'config': {'anos': args.anos, 'linhas_por_ano': args.linhas, 'seed': args.seed,
+                   'interacoes': args.interacoes, 'pesos': INTERACOES},
+        'aquecimento_s': aquecimento,
+        'pico_rss_mb': pico_rss_mb(),
+        'niveis': niveis,
+    }
+    caminho_saida = args.saida or os.path.join(args.dir, f"carga_{saida['commit'] or 'local'}.json")
+    with open(caminho_saida, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=2, ensure_ascii=False)
+    pico = f" (pico RSS {saida['pico_rss_mb']:.0f} MB)" if saida['pico_rss_mb'] is not None else ""
+    print(f"\n📑 Resultados salvos em {caminho_saida}{pico}")
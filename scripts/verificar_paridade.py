@@ -0,0 +1,117 @@
+# verificar_paridade.py
+# Descrição: Confere que os backends de consulta (modules/query_backend.py) produzem
+#            os mesmos dados de gráfico: o pandas é a referência, o arrow é comparado a ele.
+#
+# Uso:
+#   python verificar_paridade.py                       -> gera dados sintéticos em /tmp e compara
+#   python verificar_paridade.py --dir /tmp/databurn --sem-gerar
+# Também compara dois anos sobrepostos (linhas repetidas entre os CSVs), gerados
+# em --dir/sobreposicao. Sai com código 1 se algum gráfico divergir.
+
+import argparse
+import itertools
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd
+
+from gerar_dados_sinteticos import ANOS_PADRAO, generate_dataset, generate_overlap
+from modules.cube import group_mean, group_size
+from modules.data_loader import load_years_with_report, dataset_version, columnar_sources
+from modules.dataset import prepare_dataset
+from modules.query_backend import ArrowBackend, PandasBackend
+from modules.spatial import heatmap_cells
+from modules.temporal import date_bounds
+
+COL_ESTADO = 'Estado'
+COL_CIDADE = 'Municipio'
+
+# Dados de cada gráfico do dashboard, a partir da agregação de um backend
+# (b = backend, f = filtros: estado, cidade, período e região)
+GRAFICOS = {
+    'evolucao_ano': lambda b, f: group_mean(b.aggregate('Ano', *f), 'Ano', 'RiscoFogo'),
+    'evolucao_mes': lambda b, f: group_mean(b.aggregate('Mes', *f), 'Mes', 'RiscoFogo'),
+    'evolucao_semana': lambda b, f: group_mean(b.aggregate('Semana', *f), 'Semana', 'RiscoFogo'),
+    'evolucao_dia': lambda b, f: group_mean(b.aggregate('Dia', *f), 'Dia', 'RiscoFogo'),
+    'sazonal': lambda b, f: group_size(b.aggregate('Mes_Nome', *f), 'Mes_Nome', 'Quantidade de Focos'),
+    'volume_dia': lambda b, f: group_size(b.aggregate('Dia', *f), 'Dia', 'Quantidade de Focos'),
+    'ranking_risco': lambda b, f: group_mean(b.aggregate(COL_CIDADE, *f), COL_CIDADE, 'RiscoFogo'),
+    'ranking_chuva': lambda b, f: group_mean(b.aggregate(COL_CIDADE, *f), COL_CIDADE, 'Precipitacao'),
+    'biomas': lambda b, f: group_size(b.aggregate('Bioma', *f), 'Bioma', 'Contagem'),
+    'mapa': lambda b, f: heatmap_cells(b.grid(*f), 'Latitude', 'Longitude', 5),
+}
+
+
+def normalizar(df):
+    """Compara só o conteúdo: rótulos como texto e linhas em ordem canônica."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            df[col] = df[col].astype(str)
+    return df.sort_values(list(df.columns[:2])).reset_index(drop=True)
+
+
+def verificar(anos):
+    df, relatorio = load_years_with_report(anos)
+    dados = prepare_dataset(dataset_version(relatorio), df, COL_ESTADO, COL_CIDADE)
+    referencia = PandasBackend(dados)
+    arrow = ArrowBackend(columnar_sources(relatorio), list(df.columns))
+
+    contagem = dados['df'].groupby([COL_ESTADO, COL_CIDADE], observed=True).size()
+    estado, cidade = contagem.idxmax()
+    selecoes = [("Todos", "Todas"), (estado, "Todas"), (estado, cidade), ("Todos", cidade)]
+    # Sem período e um trecho do meio do conjunto (limites no meio de semanas e meses)
+    inicio, fim = date_bounds(dados['tempo'])
+    meio = inicio + (fim - inicio) / 3
+    periodos = [None, (meio, meio + (fim - inicio) / 4)]
+    # Sem recorte, um retângulo e um raio em volta do centro dos dados
+    sul, norte, oeste, leste = dados['espaco']['limites']
+    lat, lon = (sul + norte) / 2, (oeste + leste) / 2
+    regioes = [None, ('caixa', lat - 3, lat + 2, lon - 4, lon + 1), ('raio', lat, lon, 250.0)]
+
+    falhas = 0
+    for filtros in itertools.product(selecoes, periodos, regioes):
+        (estado_sel, cidade_sel), periodo, regiao = filtros
+        for nome, grafico in GRAFICOS.items():
+            f = (estado_sel, cidade_sel, periodo, regiao)
+            esperado = normalizar(grafico(referencia, f))
+            obtido = normalizar(grafico(arrow, f))
+            rotulo = f"{nome:<15} {estado_sel} / {cidade_sel} / {periodo or 'tudo'} / {regiao or 'mapa'}"
+            try:
+                pd.testing.assert_frame_equal(esperado, obtido, check_dtype=False, rtol=1e-9)
+                print(f"  ✅ {rotulo}")
+            except AssertionError as e:
+                falhas += 1
+                print(f"  ❌ {rotulo}\n{e}")
+    return falhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paridade entre os backends de consulta")
+    parser.add_argument("--dir", default="/tmp/databurn_paridade", help="Diretório dos dados sintéticos")
+    parser.add_argument("--linhas", type=int, default=50_000, help="Linhas por ano")
+    parser.add_argument("--anos", type=int, nargs="+", default=ANOS_PADRAO)
+    parser.add_argument("--sem-gerar", action="store_true", help="Usa os CSVs já existentes em --dir")
+    args = parser.parse_args()
+    args.dir = os.path.abspath(args.dir)
+
+    if not args.sem_gerar:
+        generate_dataset(args.dir, args.anos, args.linhas)
+    # O loader usa caminhos relativos (data/db_{ano}/...)
+    os.chdir(args.dir)
+
+    falhas = verificar(args.anos)
+
+    # Anos sobrepostos: a montagem descarta as repetidas, o arrow tem de descontá-las
+    sobrepostos = sorted(args.anos)[:2]
+    if len(sobrepostos) == 2:
+        print(f"\n🔁 Anos sobrepostos {sobrepostos[0]}-{sobrepostos[1]} (linhas repetidas entre os CSVs)")
+        pasta = os.path.join(args.dir, "sobreposicao")
+        generate_overlap(pasta, sobrepostos)
+        os.chdir(pasta)
+        falhas += verificar(sobrepostos)
+    print(f"\n{'📑 Backends equivalentes.' if falhas == 0 else f'⚠️ {falhas} divergência(s).'}")
+    sys.exit(1 if falhas else 0)
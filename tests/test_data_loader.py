@@ -0,0 +1,158 @@
+# test_data_loader.py
+# Descrição: Ingestão incremental do cache colunar (modules/data_loader.py): o
+#            resultado de cada leitura tem de ser igual ao de uma reconstrução
+#            completa do mesmo CSV, e o cubo atualizado igual ao recalculado.
+#
+# Uso:
+#   python -m pytest -q tests
+
+import os
+import shutil
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+import modules.dataset as dataset
+
+from gerar_dados_sinteticos import generate_dataset
+from modules.cube import DIMENSOES_CUBO, build_cube
+from modules.data_loader import dataset_version, load_years_with_report, previous_version, read_year_file
+from modules.dataset import clear_prepared, prepare_dataset
+
+ANO = 2023
+
+
+@pytest.fixture
+def csv_ano(tmp_path, monkeypatch):
+    """CSV de um ano em tmp_path/data/db_{ano}, e linhas extras (sem cabeçalho)
+    de outro conjunto sintético para acrescentar."""
+    caminho = generate_dataset(str(tmp_path), [ANO], linhas_por_ano=3_000)[0]
+    extra = generate_dataset(str(tmp_path / "extra"), [ANO], linhas_por_ano=500, seed=7)[0]
+    with open(extra, encoding="utf-8") as f:
+        linhas = f.readlines()[1:]
+    monkeypatch.chdir(tmp_path)
+    yield os.path.relpath(caminho, tmp_path), linhas
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    clear_prepared()
+
+
+def _acrescentar(caminho, texto):
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write(texto)
+
+
+def _reconstrucao(caminho, pasta):
+    """Leitura do zero (sem cache) de uma cópia do CSV."""
+    os.makedirs(pasta)
+    copia = os.path.join(pasta, os.path.basename(caminho))
+    shutil.copyfile(caminho, copia)
+    df, origem = read_year_file(copia, ANO)
+    assert origem == 'csv'
+    return df
+
+
+def _comparar(obtido, esperado):
+    pd.testing.assert_frame_equal(obtido.reset_index(drop=True), esperado.reset_index(drop=True))
+
+
+def test_linhas_acrescentadas(csv_ano, tmp_path):
+    caminho, extras = csv_ano
+    read_year_file(caminho, ANO)
+    _acrescentar(caminho, "".join(extras[:200]))
+
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'incremental'
+    _comparar(df, _reconstrucao(caminho, tmp_path / "completa"))
+    # Sem mudanças no CSV, o Parquet regravado já basta
+    assert read_year_file(caminho, ANO)[1] == 'parquet'
+
+
+def test_linha_incompleta_fica_para_depois(csv_ano, tmp_path):
+    caminho, extras = csv_ano
+    read_year_file(caminho, ANO)
+    linha = extras[100]
+    _acrescentar(caminho, "".join(extras[:100]) + linha[:len(linha) // 2])
+
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'incremental'
+    esperado = _reconstrucao(caminho, tmp_path / "parcial")
+    _comparar(df, esperado)
+
+    # Completada a linha, ela entra na próxima leitura
+    _acrescentar(caminho, linha[len(linha) // 2:])
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'incremental'
+    completa = _reconstrucao(caminho, tmp_path / "completa")
+    _comparar(df, completa)
+    assert len(completa) > len(esperado)
+
+
+def test_reconstrucao_completa_na_primeira_leitura_com_linha_incompleta(csv_ano, tmp_path):
+    caminho, extras = csv_ano
+    linha = extras[0]
+    _acrescentar(caminho, linha[:len(linha) // 2])
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'csv'
+
+    _acrescentar(caminho, linha[len(linha) // 2:])
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'incremental'
+    _comparar(df, _reconstrucao(caminho, tmp_path / "completa"))
+
+
+@pytest.mark.parametrize("mudanca", ['truncado', 'mesmo_tamanho', 'reescrito_e_maior'])
+def test_arquivo_truncado_ou_reescrito(csv_ano, tmp_path, mudanca):
+    caminho, extras = csv_ano
+    read_year_file(caminho, ANO)
+    with open(caminho, encoding="utf-8") as f:
+        linhas = f.readlines()
+    if mudanca == 'truncado':
+        linhas = linhas[:-50]
+    else:
+        # Troca uma linha do meio por outra de mesmo tamanho
+        troca = next(l for l in extras if len(l) == len(linhas[10]))
+        linhas[10] = troca
+        if mudanca == 'reescrito_e_maior':
+            linhas += extras[:20]
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.writelines(linhas)
+
+    df, origem = read_year_file(caminho, ANO)
+    assert origem == 'csv'
+    _comparar(df, _reconstrucao(caminho, tmp_path / "completa"))
+
+
+def _normalizar(tabela, dims):
+    tabela = tabela.copy()
+    for col in dims:
+        tabela[col] = tabela[col].astype(str)
+    return tabela.sort_values(dims).reset_index(drop=True)
+
+
+def test_cubo_atualizado_igual_ao_recalculado(csv_ano, monkeypatch):
+    caminho, extras = csv_ano
+    df, relatorio = load_years_with_report([ANO])
+    prepare_dataset(dataset_version(relatorio), df, 'Estado', 'Municipio')
+
+    _acrescentar(caminho, "".join(extras[:300]))
+    df, relatorio = load_years_with_report([ANO])
+    anterior = previous_version(relatorio)
+    assert anterior is not None and anterior[1] > 0
+    # Só as linhas novas são agregadas
+    agregadas = []
+    monkeypatch.setattr(dataset, "build_cube", lambda d: agregadas.append(len(d)) or build_cube(d))
+    dados = prepare_dataset(dataset_version(relatorio), df, 'Estado', 'Municipio', anterior)
+
+    dims = [c for c in DIMENSOES_CUBO if c in df.columns]
+    pd.testing.assert_frame_equal(
+        _normalizar(dados['cube'], dims), _normalizar(build_cube(df), dims), check_dtype=False
+    )
+    assert agregadas == [anterior[1]]
+    assert dados['cube']['n_focos'].sum() == len(df)
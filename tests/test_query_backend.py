@@ -0,0 +1,94 @@
+# test_query_backend.py
+# Descrição: Paridade entre os backends de consulta (modules/query_backend.py) num
+#            conjunto sintético pequeno, com e sem linhas repetidas entre os anos.
+#            Os filtros e gráficos são os de scripts/verificar_paridade.py.
+#
+# Uso:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
+
+import pytest
+import streamlit as st
+
+import modules.data_loader as data_loader
+
+from gerar_dados_sinteticos import generate_dataset, generate_overlap
+from modules.data_loader import columnar_sources, dataset_version, load_years_with_report
+from modules.dataset import clear_prepared, prepare_dataset
+from modules.query_backend import ArrowBackend, PandasBackend, get_backend
+from verificar_paridade import COL_CIDADE, COL_ESTADO, verificar
+
+ANOS = [2021, 2022]
+
+
+@pytest.fixture
+def dados_sinteticos(tmp_path, monkeypatch):
+    """Gera os CSVs em tmp_path e muda para lá (o loader usa data/db_{ano}/...)."""
+    def gerar(cenario):
+        if cenario == 'sobreposicao':
+            generate_overlap(str(tmp_path), ANOS, linhas_por_ano=2_000, repetidas=40)
+        else:
+            generate_dataset(str(tmp_path), ANOS, linhas_por_ano=2_000)
+        monkeypatch.chdir(tmp_path)
+        return ANOS
+    yield gerar
+    # Os caches são por processo: cada teste começa do zero
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    clear_prepared()
+
+
+@pytest.mark.parametrize("cenario", ['anos_distintos', 'sobreposicao'])
+def test_backends_equivalentes(dados_sinteticos, cenario):
+    assert verificar(dados_sinteticos(cenario)) == 0
+
+
+def test_arrow_desconta_repetidas_entre_anos(dados_sinteticos):
+    df, relatorio = load_years_with_report(dados_sinteticos('sobreposicao'))
+    dados = prepare_dataset(dataset_version(relatorio), df, COL_ESTADO, COL_CIDADE)
+    arrow = ArrowBackend(columnar_sources(relatorio), list(df.columns))
+    repetidas = sum((item['quarentena'] or {}).get('duplicadas_entre_anos', 0) for item in relatorio)
+    assert repetidas > 0
+
+    total = arrow.aggregate('Ano', "Todos", "Todas", None, None)['n_focos'].sum()
+    assert total == len(dados['df'])
+    assert total == PandasBackend(dados).aggregate('Ano', "Todos", "Todas", None, None)['n_focos'].sum()
+
+
+def _acrescentar_linhas(tmp_path, ano):
+    """Acrescenta ao CSV do ano as linhas de outro conjunto sintético."""
+    generate_dataset(str(tmp_path / "extra"), [ano], linhas_por_ano=300, seed=7)
+    with open(tmp_path / "extra" / f"data/db_{ano}/dados_{ano}.csv", encoding="utf-8") as f:
+        linhas = f.readlines()[1:]
+    with open(tmp_path / f"data/db_{ano}/dados_{ano}.csv", "a", encoding="utf-8") as f:
+        f.writelines(linhas)
+
+
+def test_arrow_so_com_parquet_atualizado(dados_sinteticos, tmp_path, monkeypatch):
+    anos = dados_sinteticos('anos_distintos')
+    df, relatorio = load_years_with_report(anos)
+    dados = prepare_dataset(dataset_version(relatorio), df, COL_ESTADO, COL_CIDADE)
+    fontes = tuple(columnar_sources(relatorio))
+    assert [ano for ano, _ in fontes] == anos
+    assert get_backend("arrow", dataset_version(relatorio), dados, fontes).nome == "arrow"
+
+    # Linhas novas que o cache colunar não conseguiu gravar: o Parquet é o anterior
+    def falhar(*args, **kwargs):
+        raise OSError("sem espaço")
+    monkeypatch.setattr(data_loader, "_gravar_cache", falhar)
+    _acrescentar_linhas(tmp_path, anos[-1])
+    df, relatorio = load_years_with_report(anos)
+    assert relatorio[-1]['aviso'] and relatorio[-1]['origem'] == 'incremental'
+    assert columnar_sources(relatorio) == []
+
+    dados = prepare_dataset(dataset_version(relatorio), df, COL_ESTADO, COL_CIDADE)
+    backend = get_backend("arrow", dataset_version(relatorio), dados, tuple(columnar_sources(relatorio)))
+    assert backend.nome == "pandas"
+    total = backend.aggregate('Ano', "Todos", "Todas", None, None)['n_focos'].sum()
+    assert total == len(df)
@@ -0,0 +1,65 @@
+# test_spatial.py
+# Descrição: O índice espacial (modules/spatial.py) acha as mesmas linhas que a
+#            varredura completa com region_mask, para raios pequenos e grandes.
+#
+# Uso:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.spatial import build_spatial_index, region_bbox, region_mask, region_positions
+
+
+@pytest.fixture(scope="module")
+def pontos():
+    """Pontos aleatórios sobre todo o globo, com linhas sem coordenada."""
+    rng = np.random.default_rng(7)
+    n = 300_000
+    df = pd.DataFrame({
+        'Latitude': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+        'Longitude': rng.uniform(-180, 180, n),
+    })
+    df.loc[rng.choice(n, 500, replace=False), 'Latitude'] = np.nan
+    return df, build_spatial_index(df)
+
+
+@pytest.mark.parametrize("km", [5.0, 50.0, 500.0, 3000.0, 5000.0])
+@pytest.mark.parametrize("lat", [0.0, -30.0, -60.0, -80.0])
+@pytest.mark.parametrize("lon", [-50.0, 175.0])
+def test_raio_igual_a_varredura(pontos, lat, lon, km):
+    df, indice = pontos
+    regiao = ('raio', lat, lon, km)
+    esperado = np.flatnonzero(region_mask(df['Latitude'], df['Longitude'], regiao))
+    np.testing.assert_array_equal(region_positions(indice, df, regiao), esperado)
+
+
+@pytest.mark.parametrize("lat", [-30.0, -60.0])
+@pytest.mark.parametrize("km", [500.0, 3000.0])
+def test_retangulo_do_raio_contem_o_circulo(lat, km):
+    # Pontos sobre a borda do círculo, em todas as direções
+    sul, norte, oeste, leste = region_bbox(('raio', lat, -50.0, km))
+    d = km / 6371.0088
+    rumo = np.linspace(0, 2 * np.pi, 3601)
+    lat0 = np.radians(lat)
+    lat2 = np.arcsin(np.sin(lat0) * np.cos(d) + np.cos(lat0) * np.sin(d) * np.cos(rumo))
+    lon2 = -50.0 + np.degrees(np.arctan2(np.sin(rumo) * np.sin(d) * np.cos(lat0),
+                                         np.cos(d) - np.sin(lat0) * np.sin(lat2)))
+    lat2 = np.degrees(lat2)
+    folga = 1e-9
+    assert lat2.min() >= sul - folga and lat2.max() <= norte + folga
+    assert lon2.min() >= oeste - folga and lon2.max() <= leste + folga
+
+
+def test_retangulo(pontos):
+    df, indice = pontos
+    regiao = ('caixa', -35.5, -2.25, -74.0, -33.1)
+    esperado = np.flatnonzero(region_mask(df['Latitude'], df['Longitude'], regiao))
+    np.testing.assert_array_equal(region_positions(indice, df, regiao), esperado)
@@ -0,0 +1,48 @@
+# test_table.py
+# Descrição: Ordenação e busca da tabela paginada (modules/table.py): nulos
+#            sempre no fim e empates na ordem original, nas duas direções.
+#
+# Uso:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.table import table_page, table_positions
+
+COLUNAS = {
+    'texto': pd.Series(['b', None, 'a', 'c', 'a', None], dtype=object),
+    'string': pd.Series(['b', None, 'a', 'c', 'a', None], dtype='string'),
+    'categoria': pd.Series(['b', None, 'a', 'c', 'a', None], dtype='category'),
+    'numero': pd.Series([2.0, np.nan, 1.0, 3.0, 1.0, np.nan]),
+}
+
+
+@pytest.mark.parametrize("tipo", list(COLUNAS))
+def test_ordem_crescente_e_decrescente(tipo):
+    df = pd.DataFrame({'c': COLUNAS[tipo]})
+    np.testing.assert_array_equal(table_positions(df, 'c'), [2, 4, 0, 3, 1, 5])
+    np.testing.assert_array_equal(table_positions(df, 'c', decrescente=True), [3, 0, 2, 4, 1, 5])
+
+
+def test_texto_com_nulo_nao_perde_linhas():
+    df = pd.DataFrame({'c': ['b', None, 'a', 'c']})
+    posicoes = table_positions(df, 'c')
+    np.testing.assert_array_equal(posicoes, [2, 0, 3, 1])
+    pagina, total = table_page(df, posicoes, 1, 25)
+    assert total == 4
+    assert pagina['c'].tolist()[:3] == ['a', 'b', 'c'] and pd.isna(pagina['c'].iloc[3])
+
+
+def test_ordem_sobre_a_busca():
+    df = pd.DataFrame({'cidade': ['Sorriso', 'Sinop', None, 'Lucas', 'Sapezal'],
+                       'valor': [3, 1, 5, 2, 4]})
+    posicoes = table_positions(df, 'cidade', decrescente=True, col_busca='cidade', texto_busca='s')
+    assert df['cidade'].iloc[posicoes].tolist() == ['Sorriso', 'Sinop', 'Sapezal', 'Lucas']
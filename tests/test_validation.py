@@ -0,0 +1,121 @@
+# test_validation.py
+# Descrição: Validação e quarentena na carga (modules/validation.py): sentinelas,
+#            faixas, repetidas no mesmo ano e entre anos, e as contagens que o
+#            relatório de carga mostra (modules/ui.py).
+#
+# Uso:
+#   python -m pytest -q tests
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "scripts"))
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+from gerar_dados_sinteticos import generate_overlap
+from modules.data_loader import load_years_with_report
+from modules.ui import _texto_quarentena
+from modules.validation import (
+    cross_year_duplicates, drop_cross_year_duplicates, merge_summaries, validate
+)
+
+
+def _deteccoes(**colunas):
+    """Detecções já no schema; as colunas dadas substituem as padrão."""
+    n = len(next(iter(colunas.values())))
+    base = {
+        'DataHora': pd.date_range("2024-08-01", periods=n, freq="h"),
+        'Latitude': np.linspace(-20.0, -10.0, n),
+        'Longitude': np.linspace(-60.0, -50.0, n),
+        'FRP': np.full(n, 10.0),
+        'RiscoFogo': np.full(n, 0.5),
+        'Precipitacao': np.zeros(n),
+    }
+    base.update(colunas)
+    df = pd.DataFrame(base)
+    df['Ano'] = df['DataHora'].dt.year.astype(np.int16)
+    return df
+
+
+def test_sentinelas_viram_vazio_sem_quarentena():
+    df, resumo = validate(_deteccoes(RiscoFogo=[0.5, -999.0, -9999.0, 0.7],
+                                     Precipitacao=[-999.0, 1.0, 2.0, 3.0]))
+    assert len(df) == 4 and resumo['quarentena'] == 0
+    assert resumo['sentinelas'] == {'RiscoFogo': 2, 'Precipitacao': 1}
+    assert df['RiscoFogo'].isna().tolist() == [False, True, True, False]
+
+
+def test_fora_da_faixa_vai_para_a_quarentena():
+    df, resumo = validate(_deteccoes(Latitude=[-10.0, 95.0, -10.5, np.nan, -11.0],
+                                     FRP=[1.0, 2.0, -5.0, 3.0, np.nan]))
+    # NaN é ausente, não fora da faixa; uma linha pode estar fora em mais de uma coluna
+    assert resumo['fora_da_faixa'] == {'Latitude': 1, 'FRP': 1}
+    assert resumo['quarentena'] == 2 and resumo['linhas_validas'] == 3 == len(df)
+    assert len(resumo['exemplos']) == 2
+    assert resumo['linhas_lidas'] == 5
+
+
+def test_repetidas_no_mesmo_ano_fica_a_primeira():
+    base = _deteccoes(FRP=np.arange(6, dtype=float))
+    df = pd.concat([base, base.iloc[[1, 3]]], ignore_index=True)
+    # Chave incompleta nunca conta como repetida
+    df.loc[[0, 6], 'Latitude'] = np.nan
+    df.loc[6, 'DataHora'] = df.loc[0, 'DataHora']
+    validas, resumo = validate(df)
+    assert resumo['duplicadas'] == 1
+    assert validas['FRP'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 1.0]
+
+    # Ingestão incremental: linhas novas repetindo as já validadas
+    novas, resumo_novas = validate(base.iloc[[2, 5]].assign(FRP=7.0), anteriores=base)
+    assert len(novas) == 0 and resumo_novas['duplicadas'] == 2
+    juntos = merge_summaries(resumo, resumo_novas)
+    assert juntos['duplicadas'] == 3 and juntos['linhas_lidas'] == len(df) + 2
+
+
+def test_repetidas_entre_anos_ficam_no_primeiro_ano():
+    a = _deteccoes(DataHora=pd.date_range("2023-12-31 20:00", periods=6, freq="h"))
+    a['ano_origem'] = np.int16(2023)
+    # A exportação do ano seguinte começa antes da virada: 4 linhas repetidas
+    b = _deteccoes(DataHora=pd.date_range("2024-01-01 00:00", periods=5, freq="h"))
+    b = pd.concat([a.iloc[2:6], b], ignore_index=True)
+    b['ano_origem'] = np.int16(2024)
+    df = pd.concat([a, b], ignore_index=True)
+
+    mascara = cross_year_duplicates(df)
+    assert np.flatnonzero(mascara).tolist() == [6, 7, 8, 9]
+    sem_repetidas, removidas = drop_cross_year_duplicates(df)
+    assert removidas == {2024: 4}
+    assert len(sem_repetidas) == len(df) - 4
+
+
+@pytest.fixture
+def anos_sobrepostos(tmp_path, monkeypatch):
+    generate_overlap(str(tmp_path), [2022, 2023], linhas_por_ano=2_000, repetidas=40)
+    monkeypatch.chdir(tmp_path)
+    yield [2022, 2023]
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def test_contagens_do_relatorio_de_carga(anos_sobrepostos):
+    df, relatorio = load_years_with_report(anos_sobrepostos)
+    primeiro, segundo = relatorio
+    assert 'duplicadas_entre_anos' not in (primeiro['quarentena'] or {})
+    assert segundo['quarentena']['duplicadas_entre_anos'] == 40
+    assert len(df) == primeiro['linhas'] + segundo['linhas'] - 40
+
+    # O resumo de cada ano bate com o que foi lido do CSV
+    for item in relatorio:
+        resumo = item['quarentena']
+        assert resumo['linhas_validas'] == item['linhas']
+        assert resumo['linhas_lidas'] - resumo['quarentena'] == resumo['linhas_validas']
+    # Sentinelas do gerador (RiscoFogo = -999) aparecem no texto da sidebar
+    texto = _texto_quarentena(segundo['quarentena'])
+    assert "repetidas de outro ano: 40" in texto
+    assert "sentinelas → vazio" in texto